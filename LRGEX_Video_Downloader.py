@@ -25,6 +25,7 @@ import io
 import contextlib
 import shutil
 import time
+import random
 import requests
 import tempfile
 import gc
@@ -35,8 +36,20 @@ import platform
 import atexit
 import signal
 import multiprocessing
+import threading
+import queue
+import copy
+import functools
+import itertools
+import logging
+import logging.handlers
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import base64
+import mmap
+import struct
 from urllib.parse import urlparse
 from Crypto.Cipher import AES
 from Crypto.Util import Counter
@@ -72,11 +85,6 @@ try:
         COOKIE_DECRYPT_AVAILABLE = False
 except ImportError:
     COOKIE_DECRYPT_AVAILABLE = False
-import sqlite3
-import json
-from pathlib import Path
-import base64
-import win32crypt  # For Windows cookie decryption
 
 # Fix Windows console encoding for Unicode characters
 if sys.platform == "win32":
@@ -89,22 +97,104 @@ if sys.platform == "win32":
     except:
         pass
 
-# Gallery-dl support for photo posts with audio
-try:
-    import gallery_dl
+# Gallery-dl support for photo posts with audio (imported on first photo post)
+_gallery_dl_available = None
 
-    GALLERY_DL_AVAILABLE = True
-    print("✓ Gallery-dl support available for photo posts")
-except ImportError:
-    GALLERY_DL_AVAILABLE = False
-    print("⚠️ Gallery-dl not found. Photo post audio extraction will be skipped.")
 
+def is_gallery_dl_available():
+    """Import gallery-dl the first time a photo post needs it."""
+    global _gallery_dl_available
+    if _gallery_dl_available is None:
+        try:
+            import gallery_dl
 
-def get_available_browser():
-    """Auto-detect which browser is available for cookie extraction."""
-    browsers_to_try = ["edge", "chrome", "firefox", "safari", "opera", "brave"]
+            _gallery_dl_available = True
+            print("✓ Gallery-dl support available for photo posts")
+        except ImportError:
+            _gallery_dl_available = False
+            print(
+                "⚠️ Gallery-dl not found. Photo post audio extraction will be skipped."
+            )
+    return _gallery_dl_available
+
+
+# Browsers tried (in order) for cookie extraction
+BROWSERS_TO_TRY = ["edge", "chrome", "firefox", "safari", "opera", "brave"]
+# Detection result, cached next to the script until a browser profile changes
+BROWSER_CACHE_FILE_NAME = "browser_cache.json"
+
+_NOT_DETECTED = object()
+_available_browser = _NOT_DETECTED
+_browser_lock = threading.Lock()
+
+
+def get_browser_profile_dirs(browser):
+    """Return the directories where a browser keeps its profile on this OS."""
+    home = os.path.expanduser("~")
+    if sys.platform == "win32":
+        local = os.environ.get("LOCALAPPDATA", "")
+        roaming = os.environ.get("APPDATA", "")
+        dirs = {
+            "edge": [os.path.join(local, "Microsoft", "Edge", "User Data")],
+            "chrome": [os.path.join(local, "Google", "Chrome", "User Data")],
+            "firefox": [os.path.join(roaming, "Mozilla", "Firefox", "Profiles")],
+            "opera": [os.path.join(roaming, "Opera Software", "Opera Stable")],
+            "brave": [
+                os.path.join(local, "BraveSoftware", "Brave-Browser", "User Data")
+            ],
+        }
+    elif sys.platform == "darwin":
+        support = os.path.join(home, "Library", "Application Support")
+        dirs = {
+            "edge": [os.path.join(support, "Microsoft Edge")],
+            "chrome": [os.path.join(support, "Google", "Chrome")],
+            "firefox": [os.path.join(support, "Firefox", "Profiles")],
+            "safari": [
+                os.path.join(
+                    home, "Library", "Containers", "com.apple.Safari", "Data",
+                    "Library", "Cookies",
+                ),
+                os.path.join(home, "Library", "Cookies"),
+            ],
+            "opera": [os.path.join(support, "com.operasoftware.Opera")],
+            "brave": [os.path.join(support, "BraveSoftware", "Brave-Browser")],
+        }
+    else:
+        config = os.environ.get("XDG_CONFIG_HOME") or os.path.join(home, ".config")
+        dirs = {
+            "edge": [os.path.join(config, "microsoft-edge")],
+            "chrome": [os.path.join(config, "google-chrome")],
+            "firefox": [
+                os.path.join(config, "mozilla", "firefox"),
+                os.path.join(home, ".mozilla", "firefox"),
+                os.path.join(home, "snap", "firefox", "common", ".mozilla", "firefox"),
+            ],
+            "opera": [os.path.join(config, "opera")],
+            "brave": [os.path.join(config, "BraveSoftware", "Brave-Browser")],
+        }
+    return dirs.get(browser, [])
+
+
+def get_browser_profile_mtimes():
+    """Modification time of each installed browser's profile (None if not installed)."""
+    mtimes = {}
+    for browser in BROWSERS_TO_TRY:
+        mtimes[browser] = None
+        for profile_dir in get_browser_profile_dirs(browser):
+            try:
+                mtimes[browser] = os.stat(profile_dir).st_mtime
+                break
+            except OSError:
+                continue
+    return mtimes
 
-    for browser in browsers_to_try:
+
+def probe_available_browser(profile_mtimes):
+    """Auto-detect which browser is available for cookie extraction."""
+    for browser in BROWSERS_TO_TRY:
+        if profile_mtimes.get(browser) is None:
+            # No profile on disk - yt-dlp could not read its cookies anyway
+            continue
         try:
             # Quick test to see if browser cookies are accessible
             test_opts = {
@@ -113,9 +203,10 @@ def get_available_browser():
                 "no_warnings": True,
                 "extract_flat": True,
             }
-            with yt_dlp.YoutubeDL(test_opts) as ydl:
-                # Browser detected - suppress verbose output
-                return browser
+            with capture_output(stderr=True):
+                with yt_dlp.YoutubeDL(test_opts) as ydl:
+                    # Browser detected - suppress verbose output
+                    return browser
         except Exception:
             continue
 
@@ -123,8 +214,192 @@ def get_available_browser():
     return None
 
 
-available_browser = get_available_browser()
-TECHNICAL_LOGS = []
+def get_available_browser():
+    """Return the browser to take cookies from, or None.
+
+    Detection runs the first time a strategy needs cookies. The result is
+    cached on disk and reused until a browser profile's mtime changes.
+    """
+    global _available_browser
+    with _browser_lock:
+        if _available_browser is not _NOT_DETECTED:
+            return _available_browser
+
+        cache_path = os.path.join(get_base_dir(), BROWSER_CACHE_FILE_NAME)
+        profile_mtimes = get_browser_profile_mtimes()
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("profiles") == profile_mtimes:
+                _available_browser = cached.get("browser")
+                return _available_browser
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        _available_browser = probe_available_browser(profile_mtimes)
+        try:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump({"browser": _available_browser, "profiles": profile_mtimes}, f)
+        except OSError:
+            pass
+        return _available_browser
+
+
+# Concurrent download settings
+# Number of links processed at the same time
+MAX_DOWNLOAD_WORKERS = 6
+# Maximum simultaneous downloads per host (keeps us polite and avoids bot detection)
+HOST_CONCURRENCY_LIMITS = {
+    "youtube": 4,
+    "tiktok": 2,
+    "mega": 2,
+    "other": 2,
+}
+# Delay (seconds) a worker keeps its host slot after a download finishes
+HOST_REQUEST_DELAY = 1
+
+# Pipeline settings: worker threads per stage
+PIPELINE_STAGE_WORKERS = {
+    "resolve": 2,
+    "metadata": 4,
+    "download": MAX_DOWNLOAD_WORKERS,
+    "transcode": 2,
+    "audio": 2,
+}
+# Downloaded files allowed to wait for FFmpeg before downloads pause
+PIPELINE_MAX_PENDING_FILES = 4
+# Size of the queue in front of each stage
+PIPELINE_QUEUE_SIZES = {
+    "resolve": 16,
+    "metadata": 16,
+    "download": 16,
+    "transcode": PIPELINE_MAX_PENDING_FILES,
+    "audio": PIPELINE_MAX_PENDING_FILES,
+}
+# Marks the end of a stage's input queue
+_STAGE_DONE = object()
+
+# Download archive (skips links downloaded by earlier runs), stored next to the script
+ARCHIVE_FILE_NAME = "download_archive.db"
+
+_gallery_dl_lock = threading.Lock()
+
+# Metadata cache: how long (seconds) extracted video info is reused, and how
+# many entries are kept. Format URLs expire, so keep the TTL well under an hour.
+METADATA_CACHE_TTL = 1800
+METADATA_CACHE_MAX_ENTRIES = 512
+
+# Adaptive strategy ordering: per-domain success history, stored next to the script
+STRATEGY_STATS_FILE_NAME = "strategy_stats.json"
+# Weight kept by older results each time a new one is recorded (recent results matter more)
+STRATEGY_STATS_DECAY = 0.98
+# Below this success rate the best strategy is not trusted and all are tried in default order
+STRATEGY_EXPLORE_THRESHOLD = 0.5
+# Fraction of links that use the default order anyway, so other strategies keep being measured
+STRATEGY_EXPLORE_RATE = 0.1
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def get_host_key(link):
+    """Classify a link by the host it is downloaded from."""
+    link_lower = link.lower()
+    if "mega.nz" in link_lower or "mega.co.nz" in link_lower:
+        return "mega"
+    if "tiktok.com" in link_lower:
+        return "tiktok"
+    if "youtube.com" in link_lower or "youtu.be" in link_lower:
+        return "youtube"
+    return "other"
+
+
+@contextlib.contextmanager
+def host_slot(host_key, job=None):
+    """Hold one of the per-host download slots for the duration of the block.
+
+    The time spent waiting for the slot is added to the job's metrics.
+    """
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host_key)
+        if semaphore is None:
+            limit = HOST_CONCURRENCY_LIMITS.get(
+                host_key, HOST_CONCURRENCY_LIMITS["other"]
+            )
+            semaphore = threading.BoundedSemaphore(max(1, limit))
+            _host_semaphores[host_key] = semaphore
+    started = time.perf_counter()
+    with semaphore:
+        if job is not None:
+            add_job_wait(job, "host", time.perf_counter() - started)
+        yield
+
+
+class _ThreadLocalStream:
+    """Stream proxy that lets each thread capture its own output.
+
+    contextlib.redirect_stderr swaps sys.stderr for the whole process, which
+    breaks as soon as several downloads run at once. This proxy is installed
+    once and forwards writes to the calling thread's capture buffer if it has
+    one, otherwise to the original stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            return buffer.write(text)
+        return self._stream.write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_stream_proxy_lock = threading.Lock()
+
+
+def _get_stream_proxy(name):
+    """Install (once) and return the thread-aware proxy for sys.stdout/sys.stderr."""
+    with _stream_proxy_lock:
+        stream = getattr(sys, name)
+        if not isinstance(stream, _ThreadLocalStream):
+            stream = _ThreadLocalStream(stream)
+            setattr(sys, name, stream)
+        return stream
+
+
+@contextlib.contextmanager
+def capture_output(stdout=False, stderr=True):
+    """Capture stdout/stderr written by the current thread only.
+
+    Yields a (stdout_buffer, stderr_buffer) tuple; a buffer is None when that
+    stream is not captured.
+    """
+    buffers = []
+    proxies = []
+    for name, enabled in (("stdout", stdout), ("stderr", stderr)):
+        if not enabled:
+            buffers.append(None)
+            continue
+        proxy = _get_stream_proxy(name)
+        buffer = io.StringIO()
+        previous = getattr(proxy._local, "buffer", None)
+        proxy._local.buffer = buffer
+        proxies.append((proxy, previous))
+        buffers.append(buffer)
+    try:
+        yield tuple(buffers)
+    finally:
+        for proxy, previous in proxies:
+            proxy._local.buffer = previous
 
 
 def sanitize_filename(filename):
@@ -133,64 +408,20 @@ def sanitize_filename(filename):
 
 
 def sanitize_youtube_link(link):
-    """Sanitize YouTube links by removing unnecessary parameters and handle other platforms."""
-    # Handle TikTok links
-    if "tiktok.com" in link:
-        # Check for invalid discovery/browse pages
-        if any(
-            invalid in link
-            for invalid in ["/discover/", "/browse/", "/explore/", "/trending/"]
-        ):
-            raise ValueError(
-                f"❌ Invalid TikTok link: '{link}' is a browse/discovery page, not a video. Please use direct video links like: https://www.tiktok.com/@username/video/1234567890123456789"
-            )
-
-        # Extract video ID from TikTok links
-        if "/video/" in link:
-            video_id = re.search(r"/video/(\d+)", link)
-            if video_id:
-                return f"https://www.tiktok.com/@user/video/{video_id.group(1)}"
-        elif "vm.tiktok.com" in link or "vt.tiktok.com" in link:
-            # For shortened TikTok links, return as-is (yt-dlp will resolve the redirect)
-            return link
-        elif "/t/" in link:
-            # Handle tiktok.com/t/ style links
-            return link
-
-    # Check if it's a YouTube link
-    if "youtube.com/watch" in link or "youtu.be/" in link:
-        # Extract the video ID
-        if "youtube.com/watch" in link:
-            # Handle all possible URL malformations and patterns
-            # Fix common malformations: double ?, missing &, etc.
-            link_work = link
-
-            # Fix double question marks
-            link_work = re.sub(r"\?\?+", "?", link_work)
-
-            # Fix cases where parameters after v= use ? instead of &
-            link_work = re.sub(r"(\?v=[^&?]+)\?", r"\1&", link_work)
-
-            # Extract video ID using multiple patterns to handle edge cases
-            patterns = [
-                r"[?&]v=([a-zA-Z0-9_-]{11})",  # Standard 11-char video ID
-                r"[?&]v=([a-zA-Z0-9_-]+)",  # Any length video ID
-                r"/watch\?v=([a-zA-Z0-9_-]+)",  # Direct after /watch?
-            ]
-
-            for pattern in patterns:
-                video_id = re.search(pattern, link_work)
-                if video_id:
-                    return f"https://youtube.com/watch?v={video_id.group(1)}"
-
-        elif "youtu.be/" in link:
-            # For shortened YouTube URLs
-            video_id = re.search(r"youtu\.be/([^?&]+)", link)
-            if video_id:
-                return f"https://youtube.com/watch?v={video_id.group(1)}"
-
-    # Return original link if it doesn't match patterns or something went wrong
-    return link
+    """Sanitize links to their canonical URL (see canonicalize_link()).
+
+    Links that are not recognised are returned unchanged. Raises ValueError
+    for TikTok browse/discovery pages.
+    """
+    # Check for invalid TikTok discovery/browse pages
+    if "tiktok.com" in link and any(
+        invalid in link for invalid in ["/discover/", "/browse/", "/explore/", "/trending/"]
+    ):
+        raise ValueError(
+            f"❌ Invalid TikTok link: '{link}' is a browse/discovery page, not a video. Please use direct video links like: https://www.tiktok.com/@username/video/1234567890123456789"
+        )
+    canonical = canonicalize_link(link)
+    return canonical[2] if canonical else link
 
 
 def get_base_dir():
@@ -201,25 +432,759 @@ def get_base_dir():
         return os.path.dirname(os.path.abspath(__file__))
 
 
+# Technical log: every entry is written to technical.log next to the script as it
+# happens (rotated by size); the latest entries are also kept in memory for the
+# "Technical details" section of error_log.txt
+TECHNICAL_LOG_FILE_NAME = "technical.log"
+TECHNICAL_LOG_MAX_BYTES = 5 * 1024 * 1024
+TECHNICAL_LOG_BACKUP_COUNT = 3
+TECHNICAL_LOG_RING_SIZE = 200
+# In-memory entries are cut to this many characters (stderr dumps can be huge)
+TECHNICAL_LOG_ENTRY_CHARS = 2000
+
+_log_context = threading.local()
+
+
+@contextlib.contextmanager
+def log_job_context(job_id):
+    """Tag the technical log entries this thread writes with a job ID."""
+    previous = getattr(_log_context, "job_id", None)
+    _log_context.job_id = job_id
+    try:
+        yield
+    finally:
+        _log_context.job_id = previous
+
+
+class TechnicalLog:
+    """Thread-safe technical log with the list methods the code uses (append, clear).
+
+    Entries stream to a size-rotated file, so nothing is lost when a long
+    batch crashes, while memory only holds the last TECHNICAL_LOG_RING_SIZE
+    entries. Entries written while a job is being processed carry its job ID.
+    The file is opened on the first entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = deque(maxlen=TECHNICAL_LOG_RING_SIZE)
+        self._count = 0
+        self._logger = None
+        self._handler = None
+        self._lock = threading.Lock()
+
+    def _get_logger(self):
+        if self._logger is None:
+            # One logger per instance: a shared one would send every entry to
+            # the files of all instances
+            logger = logging.getLogger(f"lrgex.technical.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                self.path,
+                maxBytes=TECHNICAL_LOG_MAX_BYTES,
+                backupCount=TECHNICAL_LOG_BACKUP_COUNT,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(
+                logging.Formatter("%(asctime)s [%(job_id)s] [%(threadName)s] %(message)s")
+            )
+            logger.addHandler(handler)
+            self._handler = handler
+            self._logger = logger
+        return self._logger
+
+    def close(self):
+        """Close the log file (a later entry opens it again)."""
+        with self._lock:
+            if self._logger is not None:
+                self._logger.removeHandler(self._handler)
+                self._handler.close()
+                self._logger = self._handler = None
+
+    def append(self, message):
+        """Log an entry (str() of any object)."""
+        message = str(message)
+        job_id = getattr(_log_context, "job_id", None)
+        entry = message
+        if len(entry) > TECHNICAL_LOG_ENTRY_CHARS:
+            entry = entry[:TECHNICAL_LOG_ENTRY_CHARS] + f" ... (cut, full entry in {self.path})"
+        with self._lock:
+            logger = self._get_logger()
+            self._entries.append(f"[{job_id}] {entry}" if job_id else entry)
+            self._count += 1
+        logger.info(message, extra={"job_id": job_id or "-"})
+
+    def clear(self):
+        """Forget the in-memory entries (the file keeps them)."""
+        with self._lock:
+            self._entries.clear()
+            self._count = 0
+
+    @property
+    def dropped(self):
+        """Entries since the last clear() that are no longer held in memory."""
+        with self._lock:
+            return self._count - len(self._entries)
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+
+TECHNICAL_LOGS = TechnicalLog(os.path.join(get_base_dir(), TECHNICAL_LOG_FILE_NAME))
+
+
+# Link forms whose media ID can be read offline, tried in order:
+# (extractor, substring the link must contain, pattern with the ID as group 1,
+#  canonical URL template, or None to keep the link as it is)
+_CANONICAL_LINK_RULES = [
+    (
+        "youtube",
+        "youtu",
+        # watch?v= (also malformed like watch??v= or ?x=1?v=), /shorts/, /live/,
+        # /embed/, /v/ on www., m., music. and youtube-nocookie.com, and youtu.be/
+        re.compile(
+            r"(?:https?://)?(?:(?:www|m|music)\.)?"
+            r"(?:youtube(?:-nocookie)?\.com/(?:watch/?\?(?:[^#&?]*[&?])*?v=|(?:shorts|live|embed|v)/)"
+            r"|youtu\.be/)"
+            r"([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])"
+        ),
+        "https://youtube.com/watch?v={}",
+    ),
+    (
+        "tiktok",
+        "tiktok.com",
+        re.compile(r"(?:https?://)?(?:(?:www|m)\.)?tiktok\.com/(?:@[^/?#]*/)?video/(\d+)"),
+        "https://www.tiktok.com/@user/video/{}",
+    ),
+    (
+        # Photo posts keep their URL: the /photo/ path tells them apart from videos
+        "tiktok",
+        "tiktok.com",
+        re.compile(r"(?:https?://)?(?:(?:www|m)\.)?tiktok\.com/(?:@[^/?#]*/)?photo/(\d+)"),
+        None,
+    ),
+    (
+        # The link is kept: its #fragment holds the decryption key
+        "mega",
+        "mega",
+        re.compile(r"(?:https?://)?(?:www\.)?mega(?:\.co)?\.nz/(?:file/|#!)([A-Za-z0-9_-]+)"),
+        None,
+    ),
+]
+
+
+def canonicalize_link(link):
+    """Return (extractor, media ID, canonical URL) for a link, or None if unknown offline.
+
+    Every form of a link to the same media (e.g. youtu.be/ID, /shorts/ID,
+    m.youtube.com/watch?v=ID&t=5) gets the same result. Short links
+    (vm.tiktok.com) only have an ID once resolved.
+    """
+    for extractor, marker, pattern, template in _CANONICAL_LINK_RULES:
+        if marker in link:
+            match = pattern.match(link)
+            if match:
+                media_id = match.group(1)
+                return extractor, media_id, template.format(media_id) if template else link
+    return None
+
+
+def get_media_key(link):
+    """Return the (extractor, media ID) pair a link points to, or None if unknown offline."""
+    canonical = canonicalize_link(link)
+    return canonical[:2] if canonical else None
+
+
+def get_media_key_from_info(info):
+    """Return the (extractor, media ID) pair from a yt-dlp info dict."""
+    if not info or not info.get("id"):
+        return None
+    return (info.get("extractor_key") or "generic").lower(), str(info["id"])
+
+
+class DownloadArchive:
+    """Persistent record of downloaded media, keyed by extractor + media ID.
+
+    Lets a re-run skip links that were already downloaded without any network
+    call. Short links (e.g. vt.tiktok.com) have no ID until they are resolved,
+    so every processed URL is also stored as an alias of its media key.
+
+    The same database holds the batch journal: the state of every link of the
+    running batch (pending, downloading, postprocessing, done, failed), written
+    as it changes. A batch that was interrupted still has its rows on the next
+    run, which then skips the links that were finished.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL survives a crash of this process; only power loss can
+            # lose the latest state changes
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS media (
+                    extractor TEXT NOT NULL,
+                    media_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    title TEXT,
+                    video_path TEXT,
+                    audio_path TEXT,
+                    source_url TEXT,
+                    updated_at REAL,
+                    PRIMARY KEY (extractor, media_id)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS links (
+                    url TEXT PRIMARY KEY,
+                    extractor TEXT NOT NULL,
+                    media_id TEXT NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS journal (
+                    batch TEXT NOT NULL,
+                    link TEXT NOT NULL,
+                    position INTEGER,
+                    state TEXT NOT NULL,
+                    updated_at REAL,
+                    PRIMARY KEY (batch, link)
+                )"""
+            )
+
+    def lookup(self, link, media_key=None):
+        """Return the archive entry for a link as a dict, or None."""
+        with self._lock:
+            if media_key is None:
+                row = self._conn.execute(
+                    "SELECT extractor, media_id FROM links WHERE url = ?", (link,)
+                ).fetchone()
+                if row is None:
+                    return None
+                media_key = (row[0], row[1])
+            row = self._conn.execute(
+                "SELECT extractor, media_id, status, title, video_path, audio_path"
+                " FROM media WHERE extractor = ? AND media_id = ?",
+                media_key,
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("extractor", "media_id", "status", "title", "video_path", "audio_path")
+        return dict(zip(keys, row))
+
+    def is_done(self, link, media_key=None):
+        """True if the link was downloaded before and its output files still exist."""
+        entry = self.lookup(link, media_key)
+        if entry is None or entry["status"] != "done":
+            return False
+        return all(
+            os.path.exists(path)
+            for path in (entry["video_path"], entry["audio_path"])
+            if path
+        )
+
+    def record(
+        self, link, media_key, status, title=None, video_path=None, audio_path=None
+    ):
+        """Store the outcome for a media item and remember the link as its alias."""
+        if media_key is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO media (extractor, media_id, status, title, video_path,
+                                      audio_path, source_url, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (extractor, media_id) DO UPDATE SET
+                       status = excluded.status,
+                       title = COALESCE(excluded.title, media.title),
+                       video_path = COALESCE(excluded.video_path, media.video_path),
+                       audio_path = COALESCE(excluded.audio_path, media.audio_path),
+                       source_url = excluded.source_url,
+                       updated_at = excluded.updated_at""",
+                (
+                    media_key[0],
+                    media_key[1],
+                    status,
+                    title,
+                    video_path,
+                    audio_path,
+                    link,
+                    time.time(),
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO links (url, extractor, media_id) VALUES (?, ?, ?)",
+                (link, media_key[0], media_key[1]),
+            )
+
+    def batch_progress(self, batch):
+        """Return (links, finished links) journaled for a batch, or None if it has none."""
+        with self._lock:
+            count, done = self._conn.execute(
+                "SELECT COUNT(*), SUM(state = 'done') FROM journal WHERE batch = ?",
+                (batch,),
+            ).fetchone()
+        return (count, done or 0) if count else None
+
+    def begin_batch(self, batch, links, first_position=1):
+        """Journal some of a batch's links as pending.
+
+        Called once per chunk of links. Returns {link: state} for the links
+        that already had a state from an interrupted run of the same batch.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            previous = dict(
+                self._conn.execute(
+                    "SELECT link, state FROM journal WHERE batch = ? AND link IN (%s)"
+                    % ",".join("?" * len(links)),
+                    (batch, *links),
+                ).fetchall()
+            )
+            self._conn.executemany(
+                """INSERT OR IGNORE INTO journal (batch, link, position, state, updated_at)
+                   VALUES (?, ?, ?, 'pending', ?)""",
+                [
+                    (batch, link, position, now)
+                    for position, link in enumerate(links, first_position)
+                ],
+            )
+        return previous
+
+    def set_job_state(self, batch, link, state):
+        """Record a job's new state in the batch journal."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE journal SET state = ?, updated_at = ? WHERE batch = ? AND link = ?",
+                (state, time.time(), batch, link),
+            )
+
+    def prune_batch(self, batch):
+        """Drop finished journal rows the archive already has; returns how many.
+
+        Their links are still skipped before any network call, through the
+        archive's link aliases.
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                """DELETE FROM journal WHERE batch = ? AND state = 'done' AND link IN (
+                       SELECT links.url FROM links JOIN media
+                       ON media.extractor = links.extractor
+                          AND media.media_id = links.media_id
+                       WHERE media.status = 'done')""",
+                (batch,),
+            ).rowcount
+
+    def end_batch(self, batch):
+        """Forget a batch's journal once every link has been processed."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM journal WHERE batch = ?", (batch,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MetadataCache:
+    """Thread-safe LRU cache of yt-dlp info dicts with a time-to-live.
+
+    Keyed by canonical URL. Each entry also keeps the strategy that produced
+    the info and the cookies the extractor set, so the download can reuse the
+    info dict instead of extracting it a second time.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached entry for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry["stored_at"] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, info, strategy_index, cookies=()):
+        with self._lock:
+            self._entries[key] = {
+                "info": info,
+                "strategy_index": strategy_index,
+                "cookies": list(cookies),
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+METADATA_CACHE = MetadataCache(METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES)
+
+
+class OutputPathClaims:
+    """The MP4 paths of the jobs in flight.
+
+    Output files are named after the video title, so two links whose videos
+    share a title would write (and resume) the same .part file. A job claims
+    its path before downloading; a second job with the same path waits until
+    the first one is finished and then finds the MP4 already there.
+    """
+
+    def __init__(self):
+        self._paths = set()
+        self._condition = threading.Condition()
+
+    def claim(self, path):
+        """Claim path, waiting while another job holds it. Returns the claim key."""
+        key = os.path.normcase(os.path.abspath(path))
+        with self._condition:
+            while key in self._paths:
+                self._condition.wait()
+            self._paths.add(key)
+        return key
+
+    def release(self, key):
+        with self._condition:
+            self._paths.discard(key)
+            self._condition.notify_all()
+
+
+OUTPUT_PATH_CLAIMS = OutputPathClaims()
+
+
+class StrategyStats:
+    """Success rate and latency of each download strategy, per domain.
+
+    Counts decay with every new result so a strategy that stops working
+    loses its place quickly. Loaded lazily and saved as JSON.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._stats is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._stats = json.load(f)
+            except (OSError, ValueError):
+                self._stats = {}
+        return self._stats
+
+    def record(self, domain, strategy_index, success, latency=None):
+        """Record one attempt of a strategy for a domain."""
+        with self._lock:
+            domain_stats = self._load().setdefault(domain, {})
+            for entry in domain_stats.values():
+                entry["attempts"] *= STRATEGY_STATS_DECAY
+                entry["successes"] *= STRATEGY_STATS_DECAY
+            entry = domain_stats.setdefault(
+                str(strategy_index),
+                {"attempts": 0.0, "successes": 0.0, "latency": None},
+            )
+            entry["attempts"] += 1
+            if success:
+                entry["successes"] += 1
+                if latency is not None:
+                    # Moving average of seconds per successful download
+                    if entry["latency"] is None:
+                        entry["latency"] = latency
+                    else:
+                        entry["latency"] = 0.8 * entry["latency"] + 0.2 * latency
+
+    def get_order(self, domain, strategy_count):
+        """Return 1-based strategy indices, historically best first."""
+        default_order = list(range(1, strategy_count + 1))
+        with self._lock:
+            domain_stats = dict(self._load().get(domain, {}))
+        if not domain_stats or random.random() < STRATEGY_EXPLORE_RATE:
+            return default_order
+
+        def score(index):
+            entry = domain_stats.get(str(index))
+            if entry is None:
+                return (0.5, float("inf"))
+            rate = (entry["successes"] + 1) / (entry["attempts"] + 2)
+            latency = entry["latency"] if entry["latency"] is not None else float("inf")
+            return (rate, latency)
+
+        scores = {index: score(index) for index in default_order}
+        ranked = sorted(default_order, key=lambda i: (-scores[i][0], scores[i][1], i))
+        if scores[ranked[0]][0] < STRATEGY_EXPLORE_THRESHOLD:
+            # Nothing works reliably any more - go back to the default order
+            return default_order
+        return ranked
+
+    def save(self):
+        """Write the statistics to disk (atomically)."""
+        with self._lock:
+            if self._stats is None:
+                return
+            data = json.dumps(self._stats, indent=2, sort_keys=True)
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            TECHNICAL_LOGS.append(f"Could not save strategy statistics: {e}")
+
+
+STRATEGY_STATS = StrategyStats(os.path.join(get_base_dir(), STRATEGY_STATS_FILE_NAME))
+
+
+def get_strategy_domain(link):
+    """Domain key used for strategy statistics (platform name or host name)."""
+    host_key = get_host_key(link)
+    if host_key != "other":
+        return host_key
+    netloc = urlparse(link).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc or "other"
+
+
+# FFmpeg capabilities, cached next to the script per binary (path + mtime).
+# Delete the file to re-probe after installing new GPU drivers.
+FFMPEG_CAPABILITIES_FILE_NAME = "ffmpeg_capabilities.json"
+FFMPEG_CAPABILITIES_FILE = os.path.join(get_base_dir(), FFMPEG_CAPABILITIES_FILE_NAME)
+# Hardware H.264 encoders in order of preference, with the matching -hwaccel
+HARDWARE_H264_ENCODERS = [
+    ("h264_nvenc", "cuda", "NVIDIA"),
+    ("h264_amf", "dxva2", "AMD"),  # AMD typically uses DirectX Video Acceleration
+    ("h264_qsv", "qsv", "Intel"),
+]
+
+_ffmpeg_path = None
+_ffmpeg_path_lock = threading.Lock()
+_ffmpeg_capabilities = {}
+_ffmpeg_capabilities_lock = threading.Lock()
+
+
+class FFmpegCapabilities:
+    """What an FFmpeg binary supports, probed once and cached on disk."""
+
+    def __init__(
+        self,
+        path,
+        version="",
+        encoders=(),
+        decoders=(),
+        hwaccels=(),
+        usable_hardware_encoders=(),
+        ffprobe_path=None,
+    ):
+        self.path = path
+        self.version = version
+        self.encoders = set(encoders)
+        self.decoders = set(decoders)
+        self.hwaccels = set(hwaccels)
+        # Hardware encoders that passed a test encode (built in AND a GPU is present)
+        self.usable_hardware_encoders = list(usable_hardware_encoders)
+        self.ffprobe_path = ffprobe_path
+
+    def has_encoder(self, name):
+        return name in self.encoders
+
+    def has_decoder(self, name):
+        return name in self.decoders
+
+    def best_h264_encoder(self):
+        """Return (encoder, hwaccel) - the first working GPU encoder, else libx264."""
+        for encoder, hwaccel, _ in HARDWARE_H264_ENCODERS:
+            if encoder in self.usable_hardware_encoders:
+                return encoder, hwaccel if hwaccel in self.hwaccels else None
+        return "libx264", None
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "encoders": sorted(self.encoders),
+            "decoders": sorted(self.decoders),
+            "hwaccels": sorted(self.hwaccels),
+            "usable_hardware_encoders": self.usable_hardware_encoders,
+            "ffprobe_path": self.ffprobe_path,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def _parse_ffmpeg_codec_list(output):
+    """Parse `ffmpeg -encoders`/`-decoders` output into a list of codec names."""
+    names = []
+    in_list = False
+    for line in output.splitlines():
+        if line.strip().startswith("------"):
+            in_list = True
+            continue
+        parts = line.split()
+        if in_list and len(parts) >= 2:
+            names.append(parts[1])
+    return names
+
+
+def _find_ffprobe(ffmpeg_path):
+    """Find ffprobe next to the FFmpeg binary or in PATH."""
+    directory, filename = os.path.split(ffmpeg_path)
+    candidate = os.path.join(directory, filename.replace("ffmpeg", "ffprobe", 1))
+    if directory and candidate != ffmpeg_path and os.path.exists(candidate):
+        return candidate
+    return shutil.which("ffprobe")
+
+
+def probe_ffmpeg_capabilities(ffmpeg_path):
+    """Run FFmpeg to find its version, codecs, hwaccels and working GPU encoders."""
+
+    def run(*args, timeout=30):
+        return subprocess.run(
+            [ffmpeg_path, "-hide_banner", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+
+    version_result = run("-version")
+    version_result.check_returncode()
+    version = (version_result.stdout.splitlines() or [""])[0]
+    encoders = _parse_ffmpeg_codec_list(run("-encoders").stdout)
+    decoders = _parse_ffmpeg_codec_list(run("-decoders").stdout)
+    hwaccel_lines = run("-hwaccels").stdout.splitlines()
+    hwaccels = [
+        line.strip()
+        for line in hwaccel_lines
+        if line.strip() and not line.lower().startswith("hardware acceleration")
+    ]
+
+    # FFmpeg builds include GPU encoders even without a GPU - test each one
+    usable_hardware_encoders = []
+    for encoder, _, _ in HARDWARE_H264_ENCODERS:
+        if encoder not in encoders:
+            continue
+        try:
+            test = run(
+                "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                "-frames:v", "1", "-c:v", encoder, "-f", "null", "-",
+                timeout=20,
+            )
+            if test.returncode == 0:
+                usable_hardware_encoders.append(encoder)
+        except subprocess.TimeoutExpired:
+            pass
+
+    return FFmpegCapabilities(
+        ffmpeg_path,
+        version=version,
+        encoders=encoders,
+        decoders=decoders,
+        hwaccels=hwaccels,
+        usable_hardware_encoders=usable_hardware_encoders,
+        ffprobe_path=_find_ffprobe(ffmpeg_path),
+    )
+
+
+def get_ffmpeg_capabilities(ffmpeg_path=None):
+    """Return the FFmpegCapabilities for a binary, probing it at most once.
+
+    Results are kept for the process and persisted to disk keyed by the
+    binary's path, size and mtime, so later runs don't spawn FFmpeg at all.
+    """
+    if ffmpeg_path is None:
+        ffmpeg_path = get_ffmpeg_path()
+    resolved_path = shutil.which(ffmpeg_path) or ffmpeg_path
+    with _ffmpeg_capabilities_lock:
+        capabilities = _ffmpeg_capabilities.get(resolved_path)
+        if capabilities is not None:
+            return capabilities
+
+        stat = os.stat(resolved_path)
+        cache_key = f"{os.path.abspath(resolved_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        cache_path = FFMPEG_CAPABILITIES_FILE
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        if isinstance(cache, dict) and cache_key in cache:
+            capabilities = FFmpegCapabilities.from_dict(cache[cache_key])
+        else:
+            capabilities = probe_ffmpeg_capabilities(resolved_path)
+            # Only keep the current binaries (the old entry is stale after an update)
+            cache = {
+                key: value
+                for key, value in (cache.items() if isinstance(cache, dict) else [])
+                if os.path.exists(value.get("path", ""))
+                and not key.startswith(os.path.abspath(resolved_path) + "|")
+            }
+            cache[cache_key] = capabilities.to_dict()
+            try:
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    json.dump(cache, f, indent=2)
+            except OSError:
+                pass
+
+        _ffmpeg_capabilities[resolved_path] = capabilities
+        return capabilities
+
+
 def get_ffmpeg_path():
-    """Get the path to FFmpeg, checking locally and in the system PATH."""
+    """Get the path to FFmpeg, checking locally and in the system PATH.
+
+    The result is remembered for the rest of the process.
+    """
+    global _ffmpeg_path
+    with _ffmpeg_path_lock:
+        if _ffmpeg_path is None:
+            _ffmpeg_path = find_ffmpeg()
+        return _ffmpeg_path
+
+
+def find_ffmpeg():
+    """Locate FFmpeg locally or in PATH, downloading it if it's missing."""
     base_dir = get_base_dir()
     local_ffmpeg = os.path.join(base_dir, "ffmpeg.exe")
     if os.path.exists(local_ffmpeg):
         print("Using FFmpeg found locally.")
         return local_ffmpeg
     # Check if FFmpeg is available globally in PATH
-    try:
-        subprocess.run(
-            ["ffmpeg", "-version"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=True,
-        )
-        print("Using FFmpeg found in system PATH.")
-        return "ffmpeg"
-    except (FileNotFoundError, subprocess.CalledProcessError):
-        pass
+    system_ffmpeg = shutil.which("ffmpeg")
+    if system_ffmpeg:
+        try:
+            # Also verifies the binary runs (probed once, then cached on disk)
+            get_ffmpeg_capabilities(system_ffmpeg)
+            print("Using FFmpeg found in system PATH.")
+            return system_ffmpeg
+        except (OSError, subprocess.SubprocessError):
+            pass
     # FFmpeg not found, download it
     print("FFmpeg not found locally or in PATH. Downloading it now...")
     return download_ffmpeg()
@@ -253,6 +1218,12 @@ def download_ffmpeg():
             if "ffmpeg.exe" in files:
                 extracted_ffmpeg_path = os.path.join(root, "ffmpeg.exe")
                 shutil.move(extracted_ffmpeg_path, ffmpeg_path)
+                # Keep ffprobe too - it reads stream info without decoding
+                if "ffprobe.exe" in files:
+                    shutil.move(
+                        os.path.join(root, "ffprobe.exe"),
+                        os.path.join(base_dir, "ffprobe.exe"),
+                    )
                 print("✅ FFmpeg installed successfully.")
                 ffmpeg_found = True
                 break
@@ -288,39 +1259,246 @@ def download_ffmpeg():
         raise RuntimeError("Unable to download or extract FFmpeg.")
 
 
-def detect_encoder(ffmpeg_path):
-    """Detect the best available encoder (NVIDIA, AMD, Intel, or CPU)."""
-    encoders_output = subprocess.run(
-        [ffmpeg_path, "-encoders"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    ).stdout.lower()
-    if "h264_nvenc" in encoders_output:
-        print("NVIDIA GPU detected. Using h264_nvenc.")
-        return "h264_nvenc"
-    elif "h264_amf" in encoders_output:
-        print("AMD GPU detected. Using h264_amf.")
-        return "h264_amf"
-    elif "h264_qsv" in encoders_output:
-        print("Intel GPU detected. Using h264_qsv.")
-        return "h264_qsv"
-    else:
-        print("No GPU detected. Falling back to CPU (libx264).")
-        return "libx264"
+# FFmpeg post-processing executor: how many FFmpeg processes run at once and how
+# many threads each one may use. None sizes them from the CPU count (one job per
+# transcode/audio pipeline worker, at most half the cores; cores split evenly).
+FFMPEG_MAX_JOBS = None
+FFMPEG_THREADS_PER_JOB = None
 
 
-def reencode_to_mp4(input_file, output_file, ffmpeg_path):
-    """Reencode a video to MP4 format with balanced settings."""
-    encoder = detect_encoder(ffmpeg_path)
+def _filetime_to_seconds(filetime):
+    """Convert a Windows FILETIME duration (100 ns units) to seconds."""
+    return ((filetime.dwHighDateTime << 32) | filetime.dwLowDateTime) / 1e7
+
+
+def _wait_for_process(process):
+    """Wait for a child process and return (returncode, cpu_seconds).
+
+    CPU time is the process's user + system time (os.wait4 on POSIX,
+    GetProcessTimes on Windows), or None where it can't be measured.
+    """
+    if hasattr(os, "wait4"):
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, usage.ru_utime + usage.ru_stime
+
+    returncode = process.wait()
+    if platform.system() == "Windows":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            if ctypes.windll.kernel32.GetProcessTimes(
+                wintypes.HANDLE(int(process._handle)),
+                ctypes.byref(creation),
+                ctypes.byref(exit_),
+                ctypes.byref(kernel),
+                ctypes.byref(user),
+            ):
+                return returncode, _filetime_to_seconds(kernel) + _filetime_to_seconds(
+                    user
+                )
+        except (OSError, AttributeError, ValueError):
+            pass
+    return returncode, None
+
+
+class FFmpegExecutor:
+    """Runs FFmpeg jobs on a fixed number of slots, first come first served.
+
+    FFmpeg already runs in its own process, so a small thread pool that waits
+    on it is enough; the pool's queue keeps jobs in submission order. Each job
+    gets an equal share of the cores through -threads, and its CPU-time /
+    wall-time ratio is recorded to show how well it used them.
+    """
+
+    def __init__(self, max_jobs=None, threads_per_job=None):
+        cpu_count = os.cpu_count() or 1
+        pipeline_workers = (
+            PIPELINE_STAGE_WORKERS["transcode"] + PIPELINE_STAGE_WORKERS["audio"]
+        )
+        self.max_jobs = max_jobs or max(1, min(pipeline_workers, cpu_count // 2))
+        self.threads_per_job = threads_per_job or max(1, cpu_count // self.max_jobs)
+        self.job_stats = []
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, command, description="FFmpeg"):
+        """Queue an FFmpeg command; returns a Future for its exit code."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_jobs, thread_name_prefix="ffmpeg"
+                )
+        return self._pool.submit(self._run, command, description)
+
+    def run(self, command, description="FFmpeg"):
+        """Run an FFmpeg command once a slot is free and return its exit code."""
+        return self.submit(command, description).result()
+
+    def _run(self, command, description):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        _child_processes.append(process)
+        try:
+            returncode, cpu_time = _wait_for_process(process)
+        finally:
+            _child_processes.remove(process)
+        wall_time = time.perf_counter() - started
+
+        with self._lock:
+            self.job_stats.append(
+                {
+                    "description": description,
+                    "returncode": returncode,
+                    "wall_time": wall_time,
+                    "cpu_time": cpu_time,
+                }
+            )
+        if cpu_time is not None:
+            print(
+                f"⏱️ {description}: {wall_time:.1f}s, CPU/wall {cpu_time / max(wall_time, 1e-6):.1f}"
+                f" ({self.threads_per_job} threads allowed)"
+            )
+        return returncode
 
-    print(f"Reencoding {input_file} to {output_file} using {encoder}...")
+    def reset_stats(self):
+        with self._lock:
+            self.job_stats = []
 
-    command = [
+    def summary(self):
+        """One-line summary of the recorded jobs (None if nothing ran)."""
+        with self._lock:
+            stats = list(self.job_stats)
+        if not stats:
+            return None
+        wall_time = sum(job["wall_time"] for job in stats)
+        line = (
+            f"⏱️ FFmpeg: {len(stats)} job(s), {wall_time:.1f}s total,"
+            f" {self.max_jobs} at a time x {self.threads_per_job} threads"
+        )
+        measured = [job for job in stats if job["cpu_time"] is not None]
+        if measured:
+            cpu_time = sum(job["cpu_time"] for job in measured)
+            measured_wall = sum(job["wall_time"] for job in measured)
+            line += f", average CPU/wall {cpu_time / max(measured_wall, 1e-6):.1f}"
+        return line
+
+
+FFMPEG_EXECUTOR = FFmpegExecutor(FFMPEG_MAX_JOBS, FFMPEG_THREADS_PER_JOB)
+
+
+def build_ffmpeg_command(ffmpeg_path, input_file, outputs, input_args=(), threads=None):
+    """Build an FFmpeg command line; outputs is a list of (output_args, output_path)."""
+    thread_args = ["-threads", str(threads)] if threads else []
+    command = [ffmpeg_path, "-y", *thread_args, *input_args, "-i", input_file]
+    for output_args, output_path in outputs:
+        command += [*output_args, *thread_args, output_path]
+    return command
+
+
+def run_ffmpeg(ffmpeg_path, input_file, outputs, input_args=(), description="FFmpeg"):
+    """Run an FFmpeg job through the shared executor and return its exit code."""
+    command = build_ffmpeg_command(
         ffmpeg_path,
-        "-y",
-        "-i",
         input_file,
+        outputs,
+        input_args=input_args,
+        threads=FFMPEG_EXECUTOR.threads_per_job,
+    )
+    return FFMPEG_EXECUTOR.run(command, description)
+
+
+def detect_encoder(ffmpeg_path):
+    """Detect the best available encoder (NVIDIA, AMD, Intel, or CPU)."""
+    encoder, _ = get_ffmpeg_capabilities(ffmpeg_path).best_h264_encoder()
+    for hardware_encoder, _, vendor in HARDWARE_H264_ENCODERS:
+        if encoder == hardware_encoder:
+            print(f"{vendor} GPU detected. Using {encoder}.")
+            return encoder
+    print("No GPU detected. Falling back to CPU (libx264).")
+    return "libx264"
+
+
+# Codecs the MP4 container (and common players) handle - these are stream-copied
+MP4_VIDEO_CODECS = {"h264", "hevc", "av1", "mpeg4"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac", "ac3", "eac3"}
+
+_STREAM_LINE_PATTERN = re.compile(
+    r"Stream #\d+:(\d+)(?:\[\w+\])?(?:\([^)]*\))?: (Video|Audio|Subtitle|Data|Attachment): (\w+)"
+)
+
+
+def probe_media_streams(file_path, ffmpeg_path):
+    """List a file's streams as dicts with index, codec_type and codec_name.
+
+    Uses ffprobe when available, otherwise parses `ffmpeg -i` output. Both only
+    read the container headers. Returns an empty list if probing fails.
+    """
+    ffprobe_path = get_ffmpeg_capabilities(ffmpeg_path).ffprobe_path
+    try:
+        if ffprobe_path:
+            result = subprocess.run(
+                [
+                    ffprobe_path,
+                    "-v", "error",
+                    "-show_entries", "stream=index,codec_type,codec_name",
+                    "-of", "json",
+                    file_path,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+            return [
+                {
+                    "index": stream.get("index"),
+                    "codec_type": stream.get("codec_type"),
+                    "codec_name": stream.get("codec_name"),
+                }
+                for stream in json.loads(result.stdout or "{}").get("streams", [])
+            ]
+
+        # Without an output file FFmpeg prints the stream list and exits
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", "-i", file_path],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=60,
+        )
+        return [
+            {
+                "index": int(index),
+                "codec_type": codec_type.lower(),
+                "codec_name": codec_name.lower(),
+            }
+            for index, codec_type, codec_name in _STREAM_LINE_PATTERN.findall(
+                result.stderr
+            )
+        ]
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return []
+
+
+def get_stream_codec(streams, codec_type):
+    """Return the codec name of the first stream of a type (None if there isn't one)."""
+    for stream in streams:
+        if stream["codec_type"] == codec_type:
+            return stream["codec_name"]
+    return None
+
+
+def get_video_encode_args(encoder):
+    """FFmpeg arguments for the balanced H.264 re-encode."""
+    return [
         "-c:v",
         encoder,
         "-preset",
@@ -333,76 +1511,775 @@ def reencode_to_mp4(input_file, output_file, ffmpeg_path):
         "8000k",  # Variable bitrate settings
         "-g",
         "60",  # Keyframe interval for smooth playback
-        "-c:a",
-        "aac",
-        "-b:a",
-        "128k",  # High-quality audio
-        output_file,
     ]
 
-    # Add hardware acceleration flags if using GPU
-    if encoder in ["h264_nvenc", "h264_amf", "h264_qsv"]:
-        command.insert(1, "-hwaccel")
-        if encoder == "h264_nvenc":
-            command.insert(2, "cuda")
-        elif encoder == "h264_qsv":
-            command.insert(2, "qsv")
-        elif encoder == "h264_amf":
-            command.insert(2, "dxva2")  # AMD typically uses DirectX Video Acceleration
-    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-    if os.path.exists(output_file):
-        os.remove(input_file)  # Remove the original file
-    print(f"Reencoded file saved: {output_file}")
+
+def plan_mp4_conversion(streams, ffmpeg_path):
+    """Decide, per stream, whether to copy or re-encode when writing an MP4.
+
+    Returns (input_args, output_args, description). Without stream info
+    everything is re-encoded, as before.
+    """
+    video_codec = get_stream_codec(streams, "video")
+    audio_codec = get_stream_codec(streams, "audio")
+    copy_video = video_codec in MP4_VIDEO_CODECS
+    copy_audio = audio_codec in MP4_AUDIO_CODECS
+
+    input_args = []
+    output_args = []
+    if streams:
+        # Only the main video and audio stream go into the MP4
+        output_args += ["-map", "0:v:0?", "-map", "0:a:0?"]
+
+    if copy_video:
+        output_args += ["-c:v", "copy"]
+        if video_codec == "hevc":
+            output_args += ["-tag:v", "hvc1"]  # Lets Apple players open HEVC in MP4
+    elif video_codec is not None or not streams:
+        encoder = detect_encoder(ffmpeg_path)
+        _, hwaccel = get_ffmpeg_capabilities(ffmpeg_path).best_h264_encoder()
+        # Add hardware acceleration flags if using GPU (and FFmpeg supports them)
+        if encoder != "libx264" and hwaccel:
+            input_args += ["-hwaccel", hwaccel]
+        output_args += get_video_encode_args(encoder)
+
+    if copy_audio:
+        output_args += ["-c:a", "copy"]
+    elif audio_codec is not None or not streams:
+        output_args += ["-c:a", "aac", "-b:a", "128k"]  # High-quality audio
+
+    if streams and video_codec is None and audio_codec is None:
+        description = "no video or audio stream"
+    elif streams and video_codec is None:
+        if copy_audio:
+            description = "copying audio (no video stream)"
+        else:
+            description = f"re-encoding {audio_codec} audio to AAC (no video stream)"
+    elif copy_video and (copy_audio or audio_codec is None):
+        description = "remuxing (stream copy)"
+    elif copy_video:
+        description = f"copying video, re-encoding {audio_codec} audio to AAC"
+    elif copy_audio:
+        description = f"re-encoding {video_codec} video, copying audio"
+    else:
+        description = "re-encoding"
+    return input_args, output_args, description
+
+
+def get_partial_path(final_path):
+    """Temporary name a file is written under until it is complete: <stem>.partial<ext>.
+
+    The real extension stays last so FFmpeg still picks the right container.
+    """
+    stem, extension = os.path.splitext(final_path)
+    return f"{stem}.partial{extension}"
+
+
+def commit_partial_file(final_path):
+    """Atomically move a finished temporary file to its final name."""
+    os.replace(get_partial_path(final_path), final_path)
+
+
+def remove_partial_file(final_path):
+    """Delete the temporary file of an output that could not be finished."""
+    try:
+        os.remove(get_partial_path(final_path))
+    except FileNotFoundError:
+        pass
+
+
+# Matches the temporary names from get_partial_path ("<stem>.partial<ext>")
+_PARTIAL_FILE_PATTERN = re.compile(r"\.partial(\.[^.]+)?$")
+
+
+def is_partial_file(filename):
+    """True for a file that is still being written (or waits to be resumed)."""
+    return bool(_PARTIAL_FILE_PATTERN.search(filename))
+
+
+def sweep_partial_files(*folders):
+    """Delete what an interrupted run left half-written in the given folders.
+
+    Removes FFmpeg's .partial outputs, megatools staging folders and
+    gallery-dl temp folders. MEGA downloads that have a .resume file and
+    yt-dlp .part files are kept: they continue where they stopped.
+    """
+    removed = 0
+    for folder in folders:
+        try:
+            with os.scandir(folder) as scan:
+                entries = list(scan)
+        except OSError:
+            continue
+        names = {entry.name for entry in entries}
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    if entry.name.startswith((".mega_staging_", "temp_gallery_")):
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        removed += 1
+                elif entry.name.endswith(MEGA_RESUME_SUFFIX):
+                    if entry.name[: -len(MEGA_RESUME_SUFFIX)] not in names:
+                        os.remove(entry.path)  # Its download is gone
+                elif is_partial_file(entry.name):
+                    if entry.name + MEGA_RESUME_SUFFIX not in names:
+                        os.remove(entry.path)
+                        removed += 1
+            except OSError as e:
+                TECHNICAL_LOGS.append(f"Could not remove leftover file {entry.path}: {e}")
+    if removed:
+        print(f"🧹 Removed {removed} unfinished file(s) from an interrupted run")
+
+
+def reencode_to_mp4(input_file, output_file, ffmpeg_path):
+    """Convert a video to MP4, copying every stream the MP4 container supports.
+
+    Only incompatible streams are re-encoded (e.g. VP9 video or Opus audio);
+    if a stream copy fails the whole file is re-encoded as before. Raises an
+    exception when the conversion fails.
+    """
+    transcode_with_audio(input_file, output_file, ffmpeg_path)
+
+
+# Audio output mode:
+#   "mp3"  - MP3 for everything (default); MP3 sources are copied, not re-encoded
+#   "auto" - copy AAC (.m4a) and MP3 sources as-is, encode everything else to MP3
+#   "copy" - copy the native audio stream whenever a container exists for it
+#   "opus" - Opus (.opus) for everything; Opus sources are copied
+AUDIO_OUTPUT_MODE = "mp3"
+# MP3 encoding: VBR quality (0 = best, 9 = smallest), or a fixed bitrate such
+# as "192k" which takes precedence when set
+AUDIO_MP3_QUALITY = 0
+AUDIO_MP3_BITRATE = None
+AUDIO_OPUS_BITRATE = "128k"
+
+# Container used when copying an audio stream without re-encoding
+AUDIO_COPY_EXTENSIONS = {
+    "aac": ".m4a",
+    "alac": ".m4a",
+    "mp3": ".mp3",
+    "opus": ".opus",
+    "vorbis": ".ogg",
+    "flac": ".flac",
+}
+# Codecs that "auto" mode copies (played by everything our consumers use)
+AUDIO_AUTO_COPY_CODECS = {"aac", "mp3"}
+# Extensions an extracted audio file can have (used for "already exists" checks)
+AUDIO_OUTPUT_EXTENSIONS = [".mp3", ".m4a", ".opus", ".ogg", ".flac"]
+
+
+def plan_audio_output(audio_codec, mode=None):
+    """Choose how to write the audio for a source codec.
+
+    Returns (extension, codec_args, description).
+    """
+    mode = mode or AUDIO_OUTPUT_MODE
+    copy_extension = AUDIO_COPY_EXTENSIONS.get(audio_codec)
+
+    if mode == "opus":
+        if audio_codec == "opus":
+            return ".opus", ["-c:a", "copy"], "copying Opus stream"
+        return ".opus", ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE], "encoding Opus"
+
+    if mode == "copy" and copy_extension:
+        return copy_extension, ["-c:a", "copy"], f"copying {audio_codec} stream"
+    if mode == "auto" and audio_codec in AUDIO_AUTO_COPY_CODECS:
+        return copy_extension, ["-c:a", "copy"], f"copying {audio_codec} stream"
+
+    # MP3 output (also the fallback for codecs that can't be copied)
+    if audio_codec == "mp3":
+        return ".mp3", ["-c:a", "copy"], "copying MP3 stream"
+    if AUDIO_MP3_BITRATE:
+        quality_args = ["-b:a", AUDIO_MP3_BITRATE]
+    else:
+        quality_args = ["-q:a", str(AUDIO_MP3_QUALITY)]
+    return ".mp3", ["-c:a", "libmp3lame", *quality_args], "encoding MP3"
+
+
+def find_existing_audio(audio_folder, base_name):
+    """Return the path of an extracted audio file for base_name in any output format."""
+    for extension in AUDIO_OUTPUT_EXTENSIONS:
+        audio_path = os.path.join(audio_folder, base_name + extension)
+        if os.path.exists(audio_path):
+            return audio_path
+    return None
 
 
 def extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path):
-    """Extract audio as MP3 format."""
-    mp3_file_path = os.path.join(
-        audio_folder,
-        sanitize_filename(os.path.splitext(os.path.basename(file_path))[0]) + ".mp3",
+    """Extract the audio track in the format chosen by AUDIO_OUTPUT_MODE.
+
+    Despite the name (kept for compatibility) the output can be .m4a/.opus/...
+    when the mode copies the native stream. Returns the audio file's path.
+    """
+    base_name = sanitize_filename(os.path.splitext(os.path.basename(file_path))[0])
+    existing_audio = find_existing_audio(audio_folder, base_name)
+    if existing_audio:
+        print(f"⏭️ Audio file already exists, skipping extraction: {existing_audio}")
+        return existing_audio
+
+    audio_codec = get_stream_codec(probe_media_streams(file_path, ffmpeg_path), "audio")
+    extension, codec_args, description = plan_audio_output(audio_codec)
+    audio_file_path = os.path.join(audio_folder, base_name + extension)
+
+    print(f"🎵 Extracting audio from {file_path} to {audio_file_path} ({description})...")
+    returncode = run_ffmpeg(
+        ffmpeg_path,
+        file_path,
+        [(["-map", "0:a:0", "-vn", *codec_args], get_partial_path(audio_file_path))],
+        description=f"Audio {os.path.basename(audio_file_path)}",
     )
-    if os.path.exists(mp3_file_path):
-        print(f"⏭️ MP3 file already exists, skipping extraction: {mp3_file_path}")
-        return mp3_file_path
-    print(f"🎵 Extracting audio from {file_path} to {mp3_file_path}...")
-    subprocess.run(
-        [ffmpeg_path, "-y", "-i", file_path, "-q:a", "0", "-map", "a", mp3_file_path],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
+    if returncode == 0:
+        commit_partial_file(audio_file_path)
+        print(f"✅ Audio extraction completed: {audio_file_path}")
+    else:
+        remove_partial_file(audio_file_path)
+        print(f"❌ Audio extraction failed: {file_path}")
+    return audio_file_path
+
+
+def transcode_with_audio(input_file, output_file, ffmpeg_path, audio_folder=None):
+    """Write the MP4 and (with audio_folder) the extracted audio in one FFmpeg run.
+
+    The input is demuxed and decoded once and feeds both outputs, instead of
+    converting to MP4 and then decoding the MP4 again for the audio. Both files
+    are written under temporary names and only renamed into place when FFmpeg
+    succeeds. Returns the audio file's path, or None when the audio still has
+    to be extracted separately (no audio folder or stream, or the combined
+    run failed). Raises an exception when even the full re-encode fails.
+    """
+    streams = probe_media_streams(input_file, ffmpeg_path)
+    input_args, output_args, description = plan_mp4_conversion(streams, ffmpeg_path)
+
+    outputs = [(output_args, get_partial_path(output_file))]
+    audio_file_path = None
+    audio_codec = get_stream_codec(streams, "audio")
+    if audio_folder is not None and audio_codec is not None:
+        base_name = sanitize_filename(os.path.splitext(os.path.basename(output_file))[0])
+        existing_audio = find_existing_audio(audio_folder, base_name)
+        if existing_audio:
+            print(f"⏭️ Audio file already exists, skipping extraction: {existing_audio}")
+            audio_file_path = existing_audio
+        else:
+            extension, codec_args, audio_description = plan_audio_output(audio_codec)
+            audio_file_path = os.path.join(audio_folder, base_name + extension)
+            outputs.append(
+                (
+                    ["-map", "0:a:0", "-vn", *codec_args],
+                    get_partial_path(audio_file_path),
+                )
+            )
+            description += f" + {audio_description}"
+
+    print(f"Converting {input_file} to {output_file} ({description})...")
+    job_description = f"Convert {os.path.basename(output_file)}"
+    combined_audio = len(outputs) > 1
+    returncode = run_ffmpeg(
+        ffmpeg_path,
+        input_file,
+        outputs,
+        input_args=input_args,
+        description=job_description,
     )
-    print(f"✅ Audio extraction completed: {mp3_file_path}")
-    return mp3_file_path
+
+    if returncode != 0 and (combined_audio or "copy" in output_args):
+        # Retry the MP4 on its own with a full re-encode; the audio is then
+        # extracted from the MP4 by the caller as before
+        print("⚠️ Conversion failed, re-encoding the whole file instead...")
+        if combined_audio:
+            remove_partial_file(audio_file_path)
+            combined_audio = False
+            audio_file_path = None
+        input_args, output_args, _ = plan_mp4_conversion([], ffmpeg_path)
+        returncode = run_ffmpeg(
+            ffmpeg_path,
+            input_file,
+            [(output_args, get_partial_path(output_file))],
+            input_args=input_args,
+            description=job_description,
+        )
+
+    if returncode != 0:
+        remove_partial_file(output_file)
+        print(f"❌ Conversion failed: {input_file}")
+        raise Exception(
+            f"FFmpeg conversion to MP4 failed (exit code {returncode}): {input_file}"
+        )
+
+    commit_partial_file(output_file)
+    if combined_audio:
+        commit_partial_file(audio_file_path)
+        print(f"✅ Audio extraction completed: {audio_file_path}")
+    os.remove(input_file)  # Remove the original file
+    print(f"Reencoded file saved: {output_file}")
+    return audio_file_path
+
+
+# Per-job metrics: one NDJSON file per run plus a Prometheus text file (for
+# node_exporter's textfile collector), in a folder next to the script
+METRICS_ENABLED = True
+METRICS_FOLDER_NAME = "metrics"
+METRICS_PROMETHEUS_FILE_NAME = "lrgex_downloader.prom"
+
+_STAGE_NAMES = ("resolve", "metadata", "download", "transcode", "audio")
+
+
+class RunMetrics:
+    """Collects the metrics of finished jobs for one run.
+
+    Every job is appended to the run's NDJSON file as soon as it finishes (so
+    a crash or watch mode loses nothing), and the Prometheus file is rewritten
+    with the run's totals. Does nothing until start() is called.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self.ndjson_path = None
+        self.prometheus_path = None
+        self.jobs = {}
+
+    def start(self, folder):
+        """Begin a run: open a new NDJSON file in folder and reset the totals."""
+        os.makedirs(folder, exist_ok=True)
+        self.started_at = time.time()
+        self.run_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        self.ndjson_path = os.path.join(folder, f"run-{self.run_id}.ndjson")
+        self.prometheus_path = os.path.join(folder, METRICS_PROMETHEUS_FILE_NAME)
+        self.jobs = {}
+        self.stage_seconds = {name: [0, 0.0] for name in _STAGE_NAMES}
+        self.wait_seconds = {}
+        self.postprocessor_seconds = {}
+        self.strategy_jobs = {}
+        self.strategy_failures = 0
+        self.bytes = 0
+        with self._lock:
+            self._file = open(self.ndjson_path, "a", encoding="utf-8")
+
+    def record_job(self, job):
+        """Write a finished job's metrics and add them to the run totals."""
+        if self._file is None:
+            return
+        metrics = job["metrics"]
+        downloaded = metrics["bytes"] + sum(metrics["file_bytes"].values())
+        if job["state"] == "failed":
+            outcome = "failed"
+        elif "download" in metrics["stages"]:
+            outcome = "downloaded"
+        else:
+            outcome = "skipped"
+        strategy = job["strategy_index"] if job["kind"] == "video" and outcome == "downloaded" else None
+        record = {
+            "run_id": self.run_id,
+            "job_id": job["job_id"],
+            "position": job["position"],
+            "link": job["link"],
+            "kind": job["kind"],
+            "media_key": ":".join(job["media_key"]) if job["media_key"] else None,
+            "outcome": outcome,
+            "started_at": round(metrics["started_at"], 3),
+            "seconds": round(time.time() - metrics["started_at"], 3),
+            "stages": {name: round(t, 3) for name, t in metrics["stages"].items()},
+            "waits": {name: round(t, 3) for name, t in metrics["waits"].items()},
+            "postprocessors": {
+                name: round(t, 3) for name, t in metrics["postprocessors"].items()
+            },
+            "bytes": downloaded,
+            "strategy": strategy,
+            "strategy_failures": metrics["strategy_failures"],
+        }
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            self.jobs[outcome] = self.jobs.get(outcome, 0) + 1
+            for name, seconds in metrics["stages"].items():
+                totals = self.stage_seconds.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+            for totals, values in (
+                (self.wait_seconds, metrics["waits"]),
+                (self.postprocessor_seconds, metrics["postprocessors"]),
+            ):
+                for name, seconds in values.items():
+                    totals[name] = totals.get(name, 0.0) + seconds
+            if strategy is not None:
+                self.strategy_jobs[strategy] = self.strategy_jobs.get(strategy, 0) + 1
+            self.strategy_failures += metrics["strategy_failures"]
+            self.bytes += downloaded
+            text = self._prometheus_text()
+        self._write_prometheus(text)
+
+    def _prometheus_text(self):
+        lines = [
+            "# HELP lrgex_run_start_time_seconds Start of the current run (Unix time).",
+            "# TYPE lrgex_run_start_time_seconds gauge",
+            f"lrgex_run_start_time_seconds {self.started_at:.3f}",
+            "# HELP lrgex_last_job_time_seconds When the last job finished (Unix time).",
+            "# TYPE lrgex_last_job_time_seconds gauge",
+            f"lrgex_last_job_time_seconds {time.time():.3f}",
+            "# HELP lrgex_jobs_total Finished jobs by outcome.",
+            "# TYPE lrgex_jobs_total counter",
+        ]
+        lines += [
+            f'lrgex_jobs_total{{outcome="{outcome}"}} {count}'
+            for outcome, count in sorted(self.jobs.items())
+        ]
+        lines += [
+            "# HELP lrgex_stage_duration_seconds Time jobs spent in each pipeline stage.",
+            "# TYPE lrgex_stage_duration_seconds summary",
+        ]
+        for name, (count, seconds) in self.stage_seconds.items():
+            lines.append(f'lrgex_stage_duration_seconds_sum{{stage="{name}"}} {seconds:.3f}')
+            lines.append(f'lrgex_stage_duration_seconds_count{{stage="{name}"}} {count}')
+        lines += [
+            "# HELP lrgex_wait_seconds_total Time jobs waited for host and file slots.",
+            "# TYPE lrgex_wait_seconds_total counter",
+        ]
+        lines += [
+            f'lrgex_wait_seconds_total{{slot="{name}"}} {seconds:.3f}'
+            for name, seconds in sorted(self.wait_seconds.items())
+        ]
+        lines += [
+            "# HELP lrgex_postprocessor_seconds_total Time spent in yt-dlp postprocessors (merge, remux).",
+            "# TYPE lrgex_postprocessor_seconds_total counter",
+        ]
+        lines += [
+            f'lrgex_postprocessor_seconds_total{{postprocessor="{name}"}} {seconds:.3f}'
+            for name, seconds in sorted(self.postprocessor_seconds.items())
+        ]
+        lines += [
+            "# HELP lrgex_downloaded_bytes_total Bytes downloaded.",
+            "# TYPE lrgex_downloaded_bytes_total counter",
+            f"lrgex_downloaded_bytes_total {self.bytes}",
+            "# HELP lrgex_strategy_jobs_total Downloads by the strategy that succeeded.",
+            "# TYPE lrgex_strategy_jobs_total counter",
+        ]
+        lines += [
+            f'lrgex_strategy_jobs_total{{strategy="{strategy}"}} {count}'
+            for strategy, count in sorted(self.strategy_jobs.items())
+        ]
+        lines += [
+            "# HELP lrgex_strategy_failures_total Strategy attempts that failed (retries).",
+            "# TYPE lrgex_strategy_failures_total counter",
+            f"lrgex_strategy_failures_total {self.strategy_failures}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def _write_prometheus(self, text):
+        # Written atomically so the collector never reads half a file
+        temp_path = self.prometheus_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, self.prometheus_path)
+        except OSError as e:
+            TECHNICAL_LOGS.append(f"Could not write Prometheus metrics: {e}")
+
+    def summary(self):
+        """One line with the run's throughput, or None if no job finished."""
+        if not self.jobs:
+            return None
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        stages = ", ".join(
+            f"{name} {seconds / count:.1f}s"
+            for name, (count, seconds) in self.stage_seconds.items()
+            if count
+        )
+        return (
+            f"📈 {sum(self.jobs.values())} job(s) in {elapsed:.0f}s"
+            f" ({sum(self.jobs.values()) * 60 / elapsed:.1f}/min),"
+            f" {self.bytes / 1024 / 1024:.1f} MB ({self.bytes / 1024 / 1024 / elapsed:.2f} MB/s);"
+            f" avg per stage: {stages}"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+RUN_METRICS = RunMetrics()
+
+
+# Watch mode (--watch): how often the links file is checked when inotify is not
+# available, and how long inotify may stay silent before the file is checked anyway
+WATCH_POLL_INTERVAL = 1.0
+WATCH_INOTIFY_TIMEOUT = 30.0
+# A last line without a newline is taken once the file has not changed for this long
+WATCH_LINE_SETTLE = 2.0
+
+# inotify event masks (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+
+
+def _open_inotify(directory):
+    """Return a non-blocking inotify descriptor watching directory, or None.
+
+    The directory is watched rather than the file so editors that save by
+    replacing the file are noticed too. None on other platforms or if
+    inotify is unavailable; the caller then polls.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class LinksFileFollower:
+    """Follows a links file by byte offset, like `tail -f`.
+
+    Only the bytes after the last read offset are read. If the file was
+    replaced or truncated (e.g. saved by an editor), it is read again from
+    the start; the caller skips the links it has already seen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._inode = None
+        self._partial_line = False
+        self._inotify_fd = _open_inotify(os.path.dirname(os.path.abspath(path)))
+
+    def read_lines(self):
+        """Yield the lines added since the last call, advancing the offset as they are read."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self.offset:
+            self._inode = stat.st_ino
+            self.offset = 0
+        self._partial_line = False
+        if stat.st_size == self.offset:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                # A line still being written is left for later, unless the writer
+                # is done with it (editors often save without a final newline)
+                if not line.endswith(b"\n"):
+                    if time.time() - os.fstat(f.fileno()).st_mtime < WATCH_LINE_SETTLE:
+                        self._partial_line = True
+                        return
+                self.offset += len(line)
+                yield line.decode("utf-8", errors="replace")
+
+    def wait(self):
+        """Block until the links file may have changed."""
+        timeout = WATCH_LINE_SETTLE if self._partial_line else None
+        if self._inotify_fd is None:
+            time.sleep(min(timeout or WATCH_POLL_INTERVAL, WATCH_POLL_INTERVAL))
+            return
+        import select
+
+        readable, _, _ = select.select(
+            [self._inotify_fd], [], [], timeout or WATCH_INOTIFY_TIMEOUT
+        )
+        if readable:
+            # Drain the events; which file changed does not matter
+            try:
+                while os.read(self._inotify_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+
+def watch_links_file(follower, seen_links, position, make_job, archive, batch):
+    """Yield jobs for links appended to the links file until Ctrl+C.
+
+    Runs as the pipeline's job source, so downloads of earlier links go on
+    while it waits, and the workers (with their yt-dlp instances) stay up.
+    """
+    print(f"\n👀 Watching {follower.path} for new links (Ctrl+C to stop)...")
+    while True:
+        try:
+            follower.wait()
+        except KeyboardInterrupt:
+            print(
+                "\n⏹️ Stopping watch mode: finishing links in progress"
+                " (Ctrl+C again to abort)..."
+            )
+            return
+        first_new = position
+        position = yield from ingest_links(
+            read_links(follower.read_lines()),
+            seen_links,
+            archive,
+            batch,
+            make_job,
+            position,
+        )
+        if position > first_new:
+            print(
+                f"\n📥 Queued {position - first_new} new link(s)"
+                f" from {os.path.basename(follower.path)}"
+            )
+
+
+# Links are deduplicated, journaled and queued in chunks of this many, so the
+# first downloads start while the rest of the links file is still being read
+INGEST_CHUNK_SIZE = 200
+# Duplicate links listed in the summary (the rest are only counted)
+DUPLICATE_EXAMPLES_SHOWN = 5
+
+
+class SeenLinks:
+    """Normalized links seen so far, kept in a temporary SQLite database.
+
+    The database lives on disk and is deleted when closed, so memory use does
+    not grow with the number of links; lookups and inserts are one indexed
+    statement. Duplicates are counted for a summary instead of being printed
+    one by one.
+    """
+
+    def __init__(self):
+        # An empty name opens a private temporary database on disk
+        self._conn = sqlite3.connect("", check_same_thread=False)
+        self._conn.execute("CREATE TABLE seen (link TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._lock = threading.Lock()
+        self.links = 0
+        self.duplicates = 0
+        self._examples = []
+
+    def add(self, link):
+        """Remember a link; returns False if an equivalent link was seen before."""
+        with self._lock:
+            self.links += 1
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO seen (link) VALUES (?)", (get_dedupe_key(link),)
+            )
+            if cursor.rowcount == 1:
+                return True
+            self.duplicates += 1
+            if len(self._examples) < DUPLICATE_EXAMPLES_SHOWN:
+                self._examples.append(link)
+            return False
+
+    def report_duplicates(self):
+        """Print how many duplicates were skipped since the last report."""
+        with self._lock:
+            links, duplicates, examples = self.links, self.duplicates, self._examples
+            self.links, self.duplicates, self._examples = 0, 0, []
+        if not duplicates:
+            return
+        print(f"\n🔍 Skipped {duplicates} duplicate link(s) out of {links}:")
+        for link in examples:
+            print(f"   🔄 {link[:60]}...")
+        if duplicates > len(examples):
+            print(f"   ... and {duplicates - len(examples)} more")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def iter_file_lines(path):
+    """Yield the lines of a text file one at a time."""
+    with open(path, "r", encoding="utf-8") as file:
+        yield from file
+
+
+def read_links(lines):
+    """Yield the links in lines, skipping empty lines and # comments."""
+    for line in lines:
+        link = line.strip()
+        if link and not link.startswith("#"):
+            yield link
+
+
+def ingest_links(links, seen_links, archive, batch, make_job, position=0):
+    """Yield jobs for the new, unfinished links of an iterable, a chunk at a time.
+
+    Each chunk is deduplicated against seen_links, journaled, and has its
+    short links resolved before its jobs are yielded. Links an interrupted run
+    already finished are skipped. Returns the position of the last link.
+    """
+    links = iter(links)
+    while True:
+        read = list(itertools.islice(links, INGEST_CHUNK_SIZE))
+        if not read:
+            break
+        chunk = [link for link in read if seen_links.add(link)]
+        previous_states = archive.begin_batch(batch, chunk, first_position=position + 1)
+        # Short links the archive already has (by their alias) need no resolving
+        preresolve_short_links(
+            [
+                link
+                for link in chunk
+                if is_short_link(link)
+                and previous_states.get(link) != "done"
+                and not archive.is_done(link)
+            ]
+        )
+        for link in chunk:
+            position += 1
+            if previous_states.get(link) != "done":
+                yield make_job(link, position)
+    seen_links.report_duplicates()
+    return position
 
 
 def download_videos_and_audio(
-    links_file, video_folder="Videos", audio_folder="Audio", log_file="error_log.txt"
+    links_file,
+    video_folder="Videos",
+    audio_folder="Audio",
+    log_file="error_log.txt",
+    archive_file=None,
+    watch=False,
 ):
-    """Download videos and ensure only MP4 and MP3 files in respective folders."""
+    """Download videos and ensure only MP4 and MP3 files in respective folders.
+
+    archive_file defaults to download_archive.db next to the script. With
+    watch=True the links file is followed after its current links are queued:
+    appended links are downloaded as they arrive until Ctrl+C.
+    """
     os.makedirs(video_folder, exist_ok=True)
     os.makedirs(audio_folder, exist_ok=True)
     failed_links = []
     TECHNICAL_LOGS.clear()
+    FFMPEG_EXECUTOR.reset_stats()
 
     # Ensure FFmpeg is available
     ffmpeg_path = get_ffmpeg_path()
 
+    # Remove half-written files an interrupted run left behind
+    sweep_partial_files(video_folder, audio_folder)
+
     # Clean up any misplaced audio files BEFORE processing new downloads
     cleanup_misplaced_audio_files(video_folder, audio_folder, ffmpeg_path)
-    # Read the list of links
-    with open(links_file, "r", encoding="utf-8") as file:
-        links = file.readlines()
-
-    # Remove duplicates and track processed links
-    # Filter out comment lines (starting with #) and empty lines
-    raw_links = [
-        link.strip()
-        for link in links
-        if link.strip() and not link.strip().startswith("#")
-    ]
+    # Links are streamed from the file: jobs start while it is still being read
+    if watch:
+        follower = LinksFileFollower(links_file)
+        links = read_links(follower.read_lines())
+    else:
+        links = read_links(iter_file_lines(links_file))
 
     # Check if there are any valid links
-    if not raw_links:
+    first_link = next(links, None)
+    if first_link is None and not watch:
         print("\n" + "=" * 60)
         print("📝 No links found in links.txt")
         print("=" * 60)
@@ -416,86 +2293,98 @@ def download_videos_and_audio(
         print("  https://www.tiktok.com/@user/video/1234567890")
         print("  https://mega.nz/file/example#key")
         return
-    unique_links, duplicates = detect_duplicates_simple(raw_links)
-
-    if duplicates:
-        print(f"\n🔍 Found and skipped {len(duplicates)} duplicate link(s)")
+    if first_link is not None:
+        links = itertools.chain([first_link], links)
+
+    if METRICS_ENABLED:
+        RUN_METRICS.start(os.path.join(get_base_dir(), METRICS_FOLDER_NAME))
+    # Limits how many downloaded files can wait on disk for post-processing
+    pending_files = threading.BoundedSemaphore(max(1, PIPELINE_MAX_PENDING_FILES))
+    archive = DownloadArchive(
+        archive_file or os.path.join(get_base_dir(), ARCHIVE_FILE_NAME)
+    )
+    # The journal is kept per links file; an interrupted run resumes where it stopped
+    batch = os.path.abspath(links_file)
+    if watch:
+        # A watched file's journal is never ended; drop what a crash left unpruned
+        archive.prune_batch(batch)
+    progress = archive.batch_progress(batch)
+    # Watch mode always leaves a journal behind; only unfinished links mean a resume
+    if progress and not (watch and progress[1] == progress[0]):
         print(
-            f"📊 Processing {len(unique_links)} unique links out of {len(raw_links)} total links\n"
+            f"♻️ Resuming interrupted run: {progress[1]}"
+            f" of {progress[0]} link(s) already finished"
+        )
+    seen_links = SeenLinks()
+
+    def make_job(link, position):
+        return create_job(
+            link,
+            position,
+            None,
+            video_folder,
+            audio_folder,
+            ffmpeg_path,
+            pending_files=pending_files,
+            archive=archive,
+            batch=batch,
         )
 
-    for i, link in enumerate(unique_links, 1):
-        link = link.strip()
-        print(f"\nProcessing ({i}/{len(unique_links)}): {link}")
-
-        try:
-            # Clean YouTube link by removing extra parameters
-            sanitized_link = sanitize_youtube_link(link)
+    jobs = ingest_links(links, seen_links, archive, batch, make_job)
+    if watch:
 
-            # Check if it's a MEGA link
-            if "mega.nz" in sanitized_link.lower():
-                print("🔗 MEGA link detected - using megatools")
-                try:
-                    # Use the simple megatools approach
-                    result = download_mega_file(
-                        sanitized_link, video_folder, audio_folder, ffmpeg_path
-                    )
-                    if result and os.path.exists(result):
-                        print("✅ MEGA download completed successfully!")
-                    else:
-                        print("❌ MEGA download failed")
-                except Exception as mega_error:
-                    print(f"❌ MEGA download failed: {mega_error}")
-                    print("💡 The MEGA link may be invalid or expired")
-            else:
-                download_video(sanitized_link, video_folder, audio_folder, ffmpeg_path)
-            # Small delay between downloads to be respectful to servers
-            time.sleep(1)
-        except ValueError as ve:
-            # Handle validation errors (like invalid TikTok discovery pages)
-            print(f"❌ Validation Error: {ve}")
-            failed_links.append(
-                f"Link: {link}\nReason: {str(ve)}\n\n-----------------------------------------\n"
+        def watched_jobs(file_jobs):
+            position = yield from file_jobs
+            yield from watch_links_file(
+                follower, seen_links, position, make_job, archive, batch
             )
-            continue
-        except Exception as e:
-            # Handle MEGA-specific errors more gracefully
-            error_msg = str(e)
-            if "mega.nz" in sanitized_link.lower():
-                # For MEGA links, check if the file was actually downloaded despite the error
-                mega_files = [
-                    f
-                    for f in os.listdir(video_folder)
-                    if f.endswith(
-                        (".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm")
-                    )
-                ]
-                if mega_files:
-                    print(
-                        " MEGA file downloaded successfully (ignoring temporary file access error)"
-                    )
-                    continue
-                else:
-                    print(f"❌ MEGA download failed: {error_msg}")
 
-            reason = str(e).split("\n")[0]
-            # Clean up ANSI color codes from error messages
-            reason = re.sub(r"\[0;\d+m", "", reason)
-            failed_links.append(
-                f"Link: {link}\nReason: {reason}\n\n-----------------------------------------\n"
-            )
-            print(f"Failed to process {sanitized_link}: {reason}")
-            continue  # Final cleanup after all downloads
+        jobs = watched_jobs(jobs)
+
+    # Failures are reported by position so failed links keep the input order
+    try:
+        failures = run_pipeline(jobs, build_download_stages())
+        # A watched file keeps its journal: a restart then skips what is done
+        # (minus what the archive already skips by itself)
+        if watch:
+            archive.prune_batch(batch)
+        else:
+            archive.end_batch(batch)
+    finally:
+        if watch:
+            follower.close()
+        seen_links.close()
+        archive.close()
+        RUN_METRICS.close()
+        STRATEGY_STATS.save()
+        YDL_POOL.close_all()
+    failed_links.extend(entry for _, entry in sorted(failures))
+
     cleanup_misplaced_audio_files(video_folder, audio_folder, ffmpeg_path)
 
     # IMPORTANT: Extract audio from any video files that don't have corresponding MP3s
     print("\n🎵 Final check: Extracting MP3 from any videos missing audio files...")
     extract_missing_audio_files(video_folder, audio_folder, ffmpeg_path)
 
+    LIBRARY_INDEX.save()
+
+    ffmpeg_summary = FFMPEG_EXECUTOR.summary()
+    if ffmpeg_summary:
+        print(ffmpeg_summary)
+    metrics_summary = RUN_METRICS.summary()
+    if metrics_summary:
+        print(metrics_summary)
+        print(f"📈 Job metrics: {RUN_METRICS.ndjson_path}")
+
     if TECHNICAL_LOGS or failed_links:
         with open(log_file, "w", encoding="utf-8") as log:
             if TECHNICAL_LOGS:
                 log.write("Technical details:\n")
+                if TECHNICAL_LOGS.dropped:
+                    log.write(
+                        f"({TECHNICAL_LOGS.dropped} earlier entries are only in"
+                        f" {TECHNICAL_LOGS.path})\n"
+                    )
                 log.write("\n".join(TECHNICAL_LOGS))
                 log.write("\n\n")
             if failed_links:
@@ -506,194 +2395,764 @@ def download_videos_and_audio(
     print("All downloads are complete!")
 
 
-def is_tiktok_photo_post(link):
-    """Check if a TikTok link is a photo post by resolving the URL."""
+def create_job(
+    link,
+    position,
+    total,
+    video_folder,
+    audio_folder,
+    ffmpeg_path,
+    pending_files=None,
+    archive=None,
+    batch=None,
+):
+    """Create the job dictionary that is passed between pipeline stages."""
+    return {
+        # Tags the job's technical log entries and metrics
+        "job_id": uuid.uuid4().hex[:8],
+        "position": position,
+        "total": total,
+        "link": link.strip(),
+        "sanitized_link": link.strip(),
+        "host": None,
+        "kind": None,
+        "video_folder": video_folder,
+        "audio_folder": audio_folder,
+        "ffmpeg_path": ffmpeg_path,
+        "strategy_index": 1,
+        "strategy_order": None,
+        "strategy_latency": 0.0,
+        "mp4_path": None,
+        "output_claim": None,
+        "downloaded_file": None,
+        "media_file": None,
+        "audio_file": None,
+        "pending_files": pending_files,
+        "holds_file_slot": False,
+        "archive": archive,
+        "batch": batch,
+        "state": "pending",
+        "media_key": None,
+        "title": None,
+        "metrics": {
+            "started_at": time.time(),
+            "stages": {},
+            "waits": {},
+            "postprocessors": {},
+            "bytes": 0,
+            "file_bytes": {},
+            "strategy_failures": 0,
+        },
+    }
+
+
+def build_download_stages():
+    """Return the (name, handler, workers, queue_size) list for the download pipeline."""
+    return [
+        (
+            name,
+            handler,
+            max(1, PIPELINE_STAGE_WORKERS[name]),
+            max(1, PIPELINE_QUEUE_SIZES[name]),
+        )
+        for name, handler in (
+            ("resolve", resolve_stage),
+            ("metadata", metadata_stage),
+            ("download", download_stage),
+            ("transcode", transcode_stage),
+            ("audio", audio_stage),
+        )
+    ]
+
+
+def run_pipeline(jobs, stages):
+    """Run jobs through stages connected by bounded queues.
+
+    Each stage has its own worker threads. A handler returns the job to pass it
+    on to the next stage, or None when the job is finished (skipped, already
+    downloaded, or fully processed). Full queues block the upstream stage, which
+    bounds how many downloaded files wait for post-processing.
+
+    Returns a list of (position, failed-links entry) tuples.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _, _, _, queue_size in stages]
+    failures = []
+    failures_lock = threading.Lock()
+
+    def worker(stage_index):
+        name, handler = stages[stage_index][:2]
+        inbox = queues[stage_index]
+        outbox = queues[stage_index + 1] if stage_index + 1 < len(stages) else None
+        while True:
+            job = inbox.get()
+            if job is _STAGE_DONE:
+                return
+            with log_job_context(job["job_id"]):
+                started = time.perf_counter()
+                try:
+                    result = handler(job)
+                except Exception as e:
+                    job["metrics"]["stages"][name] = time.perf_counter() - started
+                    record_job_result(job, "failed")
+                    finish_job(job)
+                    entry = format_failed_link(job, e)
+                    if entry:
+                        with failures_lock:
+                            failures.append((job["position"], entry))
+                    continue
+                job["metrics"]["stages"][name] = time.perf_counter() - started
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+                else:
+                    finish_job(job)
+
+    stage_threads = []
+    for stage_index, (name, _, workers, _) in enumerate(stages):
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(stage_index,),
+                name=f"{name}-{n}",
+                daemon=True,
+            )
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        stage_threads.append(threads)
+
+    for job in jobs:
+        queues[0].put(job)
+
+    # Shut stages down in order: once every worker of a stage has finished,
+    # nothing else can arrive in the next stage's queue
+    for stage_index, threads in enumerate(stage_threads):
+        for _ in threads:
+            queues[stage_index].put(_STAGE_DONE)
+        for thread in threads:
+            # Join with a timeout so Ctrl+C still reaches the main thread
+            while thread.is_alive():
+                thread.join(0.5)
+
+    return failures
+
+
+def run_job(job, stages):
+    """Run a single job through the stages one after another in this thread."""
+    with log_job_context(job["job_id"]):
+        _run_job_stages(job, stages)
+
+
+def _run_job_stages(job, stages):
+    try:
+        for name, handler, _, _ in stages:
+            started = time.perf_counter()
+            try:
+                result = handler(job)
+            finally:
+                job["metrics"]["stages"][name] = time.perf_counter() - started
+            if result is None:
+                break
+    finally:
+        finish_job(job)
+
+
+def journal_job(job, state):
+    """Write the job's state to the batch journal (if the batch has one)."""
+    job["state"] = state
+    if job["archive"] is None or job["batch"] is None:
+        return
+    try:
+        job["archive"].set_job_state(job["batch"], job["link"], state)
+    except sqlite3.Error as e:
+        TECHNICAL_LOGS.append(f"Journal update failed for {job['link']}: {e}")
+
+
+def finish_job(job):
+    """Wrap up a job no stage has anything left to do for."""
+    release_file_slot(job)
+    if job["output_claim"] is not None:
+        OUTPUT_PATH_CLAIMS.release(job["output_claim"])
+        job["output_claim"] = None
+    if job["state"] not in ("done", "failed"):
+        # Skipped jobs (already downloaded, nothing to extract) count as done
+        journal_job(job, "done")
+    RUN_METRICS.record_job(job)
+
+
+def record_job_result(job, status, video_path=None, audio_path=None):
+    """Write the job's outcome to the download archive (if the batch has one)."""
+    journal_job(job, status)
+    if job["archive"] is None:
+        return
     try:
-        # Resolve shortened URLs
-        if "vt.tiktok.com" in link or "vm.tiktok.com" in link:
-            response = requests.head(link, allow_redirects=True, timeout=10)
-            resolved_url = response.url
+        job["archive"].record(
+            job["link"],
+            job["media_key"],
+            status,
+            title=job["title"],
+            video_path=video_path,
+            audio_path=audio_path,
+        )
+    except sqlite3.Error as e:
+        TECHNICAL_LOGS.append(f"Archive update failed for {job['link']}: {e}")
+
+
+def acquire_file_slot(job):
+    """Reserve room for one more downloaded file waiting for post-processing."""
+    if job["pending_files"] is not None and not job["holds_file_slot"]:
+        started = time.perf_counter()
+        job["pending_files"].acquire()
+        job["holds_file_slot"] = True
+        add_job_wait(job, "file_slot", time.perf_counter() - started)
+
+
+def add_job_wait(job, slot, seconds):
+    """Add time a job spent waiting for a slot to its metrics."""
+    waits = job["metrics"]["waits"]
+    waits[slot] = waits.get(slot, 0.0) + seconds
+
+
+def release_file_slot(job):
+    """Give back the job's pending-file slot once its file is fully processed."""
+    if job["holds_file_slot"]:
+        job["holds_file_slot"] = False
+        job["pending_files"].release()
+
+
+def format_failed_link(job, error):
+    """Build the error_log.txt entry for a failed job (None if it should be ignored)."""
+    link = job["link"]
+    sanitized_link = job["sanitized_link"]
+
+    if isinstance(error, ValueError):
+        # Handle validation errors (like invalid TikTok discovery pages)
+        print(f"❌ Validation Error: {error}")
+        return f"Link: {link}\nReason: {str(error)}\n\n-----------------------------------------\n"
+
+    reason = str(error).split("\n")[0]
+    # Clean up ANSI color codes from error messages
+    reason = re.sub(r"\[0;\d+m", "", reason)
+    print(f"Failed to process {sanitized_link}: {reason}")
+    return f"Link: {link}\nReason: {reason}\n\n-----------------------------------------\n"
+
+
+def resolve_stage(job):
+    """Pipeline stage: sanitize the link and decide how it will be downloaded."""
+    if job["total"]:
+        print(f"\nProcessing ({job['position']}/{job['total']}): {job['link']}")
+    else:
+        print(f"\nProcessing (#{job['position']}): {job['link']}")
+
+    # Clean YouTube link by removing extra parameters
+    job["sanitized_link"] = sanitize_youtube_link(job["link"])
+    job["host"] = get_host_key(job["sanitized_link"])
+
+    # Skip links the archive already has, before any network call: the link
+    # alias is checked first, since short links only have a media ID once resolved
+    archive = job["archive"]
+    if archive is not None and archive.is_done(job["link"]):
+        print(f"⏭️ Already in download archive, skipping: {job['link']}")
+        return None
+    job["media_key"] = get_media_key(resolve_link(job["sanitized_link"]))
+    if archive is not None and archive.is_done(job["link"], job["media_key"]):
+        print(f"⏭️ Already in download archive, skipping: {job['link']}")
+        return None
+
+    # Check if it's a MEGA link
+    if "mega.nz" in job["sanitized_link"].lower():
+        job["kind"] = "mega"
+    # DETECT PHOTO POSTS FIRST - Skip yt-dlp entirely for photo posts
+    elif is_tiktok_photo_post(job["sanitized_link"]):
+        job["kind"] = "photo"
+    else:
+        job["kind"] = "video"
+    return job
+
+
+def metadata_stage(job):
+    """Pipeline stage: extract video metadata and skip videos that already exist."""
+    if job["kind"] != "video":
+        return job
+    if not fetch_video_metadata(job):
+        return None
+    return job
+
+
+def download_stage(job):
+    """Pipeline stage: download the media file for the job."""
+    link = job["sanitized_link"]
+    if job["kind"] != "photo":
+        # Wait here (before downloading) while too many files await FFmpeg
+        acquire_file_slot(job)
+    journal_job(job, "downloading")
+    with host_slot(job["host"], job):
+        if job["kind"] == "mega":
+            print("🔗 MEGA link detected")
+            result = None
+            try:
+                # Use the simple megatools approach
+                result = download_mega_file(
+                    link,
+                    job["video_folder"],
+                    job["audio_folder"],
+                    job["ffmpeg_path"],
+                    extract_audio=False,
+                )
+            except Exception as mega_error:
+                print(f"❌ MEGA download failed: {mega_error}")
+                print("💡 The MEGA link may be invalid or expired")
+            if result and os.path.exists(result):
+                print("✅ MEGA download completed successfully!")
+                job["media_file"] = result
+                job["metrics"]["bytes"] = os.path.getsize(result)
+            else:
+                print("❌ MEGA download failed")
+                journal_job(job, "failed")
+                job = None
+        elif job["kind"] == "photo":
+            print(f"📷 Photo post detected - using gallery-dl for audio extraction")
+            try:
+                audio_path = download_photo_post_with_audio(
+                    link, job["video_folder"], job["audio_folder"], job["ffmpeg_path"]
+                )
+                print("✅ Photo post audio extracted successfully!")
+                if audio_path:
+                    record_job_result(job, "done", audio_path=audio_path)
+                job = None  # Success - nothing left to post-process
+            except Exception as photo_error:
+                TECHNICAL_LOGS.append(
+                    f"❌ Photo post extraction failed for {link}: {photo_error}"
+                )
+                raise photo_error  # This is a REAL error, not false positive
+        else:
+            download_video_file(job)
+        # Small delay between downloads to be respectful to servers
+        time.sleep(HOST_REQUEST_DELAY)
+    return job
+
+
+def transcode_stage(job):
+    """Pipeline stage: make sure downloaded videos end up as MP4 files."""
+    journal_job(job, "postprocessing")
+    if job["kind"] == "video":
+        downloaded_file = job["downloaded_file"]
+        mp4_file_path = job["mp4_path"]
+        # Check if re-encoding is needed; the audio is written by the same FFmpeg run
+        if not downloaded_file.endswith(".mp4"):
+            job["audio_file"] = transcode_with_audio(
+                downloaded_file,
+                mp4_file_path,
+                job["ffmpeg_path"],
+                audio_folder=job["audio_folder"],
+            )
         else:
-            resolved_url = link
+            os.rename(downloaded_file, mp4_file_path)
+        job["media_file"] = mp4_file_path
+    return job
+
+
+def audio_stage(job):
+    """Pipeline stage: extract the audio for the finished video."""
+    audio_file_path = job["audio_file"]
+    if not audio_file_path or not os.path.exists(audio_file_path):
+        audio_file_path = extract_audio_to_mp3(
+            job["media_file"], job["audio_folder"], job["ffmpeg_path"]
+        )
+    if os.path.exists(audio_file_path):
+        record_job_result(
+            job, "done", video_path=job["media_file"], audio_path=audio_file_path
+        )
+    return None
+
+
+# Shared HTTP session: connections per host kept alive for reuse
+HTTP_POOL_SIZE = 16
+# Resolved short links remembered for the whole run
+SHORT_LINK_CACHE_SIZE = 4096
+# Short links resolved at the same time before a batch starts
+SHORT_LINK_RESOLVE_WORKERS = 8
+SHORT_LINK_HOSTS = ("vt.tiktok.com", "vm.tiktok.com")
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return the keep-alive requests session shared by all threads."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
 
-        # Check if it's a photo post
-        return "/photo/" in resolved_url
+
+def is_short_link(link):
+    """True for redirecting short links (vt.tiktok.com, vm.tiktok.com)."""
+    return any(host in link for host in SHORT_LINK_HOSTS)
+
+
+@functools.lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def _resolve_short_link(link):
+    # Failures raise and are therefore not cached
+    response = get_http_session().head(link, allow_redirects=True, timeout=10)
+    return response.url
+
+
+def resolve_link(link):
+    """Return where a short link redirects to (other links, and failures, unchanged)."""
+    if not is_short_link(link):
+        return link
+    try:
+        return _resolve_short_link(link)
+    except requests.RequestException:
+        return link
+
+
+def preresolve_short_links(links):
+    """Resolve all short links of a batch concurrently so later lookups hit the cache."""
+    short_links = [link for link in links if is_short_link(link)]
+    if not short_links:
+        return
+    print(f"🔗 Resolving {len(short_links)} short link(s)...")
+    with ThreadPoolExecutor(
+        max_workers=max(1, SHORT_LINK_RESOLVE_WORKERS), thread_name_prefix="resolve"
+    ) as pool:
+        list(pool.map(resolve_link, short_links))
+
+
+def is_tiktok_photo_post(link):
+    """Check if a TikTok link is a photo post by resolving the URL."""
+    try:
+        # Check if it's a photo post (short links are resolved through the cache)
+        return "/photo/" in resolve_link(link)
     except:
         return False
 
 
-def download_video(link, video_folder, audio_folder, ffmpeg_path):
-    """Download video and ensure only MP4 in Videos and MP3 in Audio."""
+# Job whose download the calling thread's YoutubeDL is running (for the hooks)
+_hook_context = threading.local()
 
-    # DETECT PHOTO POSTS FIRST - Skip yt-dlp entirely for photo posts
-    if is_tiktok_photo_post(link):
-        print(f"📷 Photo post detected - using gallery-dl for audio extraction")
-        try:
-            download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path)
-            print("✅ Photo post audio extracted successfully!")
-            return  # Success - exit early
-        except Exception as photo_error:
-            TECHNICAL_LOGS.append(f"❌ Photo post extraction failed for {link}: {photo_error}")
-            raise photo_error  # This is a REAL error, not false positive
-
-    video_template = os.path.join(video_folder, sanitize_filename("%(title)s.%(ext)s"))
-
-    # Adjust yt_dlp options to prioritize MP4 with anti-bot measures
-    ydl_opts = {
-        "outtmpl": video_template,
-        "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-        "merge_output_format": "mp4",  # Ensure merged output is MP4
-        "cookiesfrombrowser": (available_browser,) if available_browser else None,
-        "extractor_retries": 3,  # Retry failed extractions
+
+def track_download_progress(progress):
+    """yt-dlp progress hook: keep the bytes downloaded per file for the job's metrics."""
+    job = getattr(_hook_context, "job", None)
+    if job is not None and progress.get("downloaded_bytes") is not None:
+        job["metrics"]["file_bytes"][progress.get("filename")] = progress[
+            "downloaded_bytes"
+        ]
+
+
+def track_postprocessor(progress):
+    """yt-dlp postprocessor hook: time each postprocessor (merger, remuxer) for the job."""
+    job = getattr(_hook_context, "job", None)
+    if job is None:
+        return
+    # Postprocessors of one download run one after another in this thread
+    if progress["status"] == "started":
+        _hook_context.postprocessor_started = time.perf_counter()
+    elif progress["status"] == "finished":
+        started = getattr(_hook_context, "postprocessor_started", None)
+        if started is None:
+            return
+        _hook_context.postprocessor_started = None
+        name = progress.get("postprocessor") or "unknown"
+        postprocessors = job["metrics"]["postprocessors"]
+        postprocessors[name] = postprocessors.get(name, 0.0) + time.perf_counter() - started
+
+
+# Download strategies tried in order until one works
+DOWNLOAD_STRATEGIES = [
+    # Strategy 1: Let yt-dlp choose the best format automatically (most reliable)
+    {
+        "merge_output_format": "mp4",
         "http_headers": {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         },
-        "sleep_interval": 1,  # Add delay between requests
-        "max_sleep_interval": 3,
-        "ignoreerrors": False,  # We'll handle errors manually
-    }  # Try multiple download strategies if the first one fails
-    download_success = False
-    strategies = [
-        # Strategy 1: Let yt-dlp choose the best format automatically (most reliable)
-        {
-            "outtmpl": video_template,
-            "merge_output_format": "mp4",
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            },
-            "extractor_args": {"tiktok": {"webpage_download": True}},
-            "cookiesfrombrowser": None,
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "progress_hooks": [lambda d: None],
+        "extractor_args": {"tiktok": {"webpage_download": True}},
+        "cookiesfrombrowser": None,
+        "quiet": True,
+        "no_warnings": True,
+        "no_color": True,
+        "progress_hooks": [track_download_progress],
+        "postprocessor_hooks": [track_postprocessor],
+    },
+    # Strategy 2: TikTok-specific configuration without cookies
+    {
+        "format": "best[ext=mp4]/best",
+        "merge_output_format": "mp4",
+        "cookiesfrombrowser": None,
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         },
-        # Strategy 2: TikTok-specific configuration without cookies
-        {
-            "outtmpl": video_template,
-            "format": "best[ext=mp4]/best",
-            "merge_output_format": "mp4",
-            "cookiesfrombrowser": None,
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            },
-            "extractor_args": {
-                "tiktok": {"webpage_download": True, "api_hostname": "api.tiktokv.com"}
-            },
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "progress_hooks": [lambda d: None],
+        "extractor_args": {
+            "tiktok": {"webpage_download": True, "api_hostname": "api.tiktokv.com"}
         },
-        # Strategy 3: YouTube-optimized with multiple format fallbacks
-        {
-            "outtmpl": video_template,
-            "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-            "merge_output_format": "mp4",
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            },
-            "extractor_retries": 3,
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "progress_hooks": [lambda d: None],
+        "quiet": True,
+        "no_warnings": True,
+        "no_color": True,
+        "progress_hooks": [track_download_progress],
+        "postprocessor_hooks": [track_postprocessor],
+    },
+    # Strategy 3: YouTube-optimized with multiple format fallbacks
+    {
+        "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        "merge_output_format": "mp4",
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         },
-        # Strategy 4: Use Firefox cookies as fallback
-        {
-            "outtmpl": video_template,
-            "merge_output_format": "mp4",
-            "cookiesfrombrowser": (available_browser,) if available_browser else None,
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0"
-            },
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "progress_hooks": [lambda d: None],
+        "extractor_retries": 3,
+        "quiet": True,
+        "no_warnings": True,
+        "no_color": True,
+        "progress_hooks": [track_download_progress],
+        "postprocessor_hooks": [track_postprocessor],
+    },
+    # Strategy 4: Use Firefox cookies as fallback
+    {
+        "merge_output_format": "mp4",
+        "use_browser_cookies": True,
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0"
         },
-        # Strategy 5: Last resort with generic extractor
-        {
-            "outtmpl": video_template,
-            "merge_output_format": "mp4",
-            "cookiesfrombrowser": (available_browser,) if available_browser else None,
-            "http_headers": {
-                "User-Agent": "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
-            },
-            "force_generic_extractor": True,
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "progress_hooks": [lambda d: None],
+        "quiet": True,
+        "no_warnings": True,
+        "no_color": True,
+        "progress_hooks": [track_download_progress],
+        "postprocessor_hooks": [track_postprocessor],
+    },
+    # Strategy 5: Last resort with generic extractor
+    {
+        "merge_output_format": "mp4",
+        "use_browser_cookies": True,
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
         },
-    ]
+        "force_generic_extractor": True,
+        "quiet": True,
+        "no_warnings": True,
+        "no_color": True,
+        "progress_hooks": [track_download_progress],
+        "postprocessor_hooks": [track_postprocessor],
+    },
+]
+
+
+def build_strategy_options(strategy_index, video_folder):
+    """Build the yt-dlp options for a (1-based) download strategy."""
+    options = dict(DOWNLOAD_STRATEGIES[strategy_index - 1])
+    options["outtmpl"] = os.path.join(
+        video_folder, sanitize_filename("%(title)s.%(ext)s")
+    )
+    # Write to .part files and continue them with HTTP Range after an interruption
+    options["continuedl"] = True
+    options["nopart"] = False
+    if options.pop("use_browser_cookies", False):
+        # Only strategies that use cookies trigger browser detection
+        browser = get_available_browser()
+        options["cookiesfrombrowser"] = (browser,) if browser else None
+    return options
+
+
+class YoutubeDLPool:
+    """Long-lived YoutubeDL instances, one per strategy, output folder and thread.
+
+    Creating a YoutubeDL loads browser cookies, sets up the extractors and
+    opens fresh connections; reusing it for every link a worker handles keeps
+    all of that warm. An instance is only ever used by the thread it was
+    created for, and the output folder is part of the key, so the per-link
+    output template never has to be changed on a live instance.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def get(self, strategy_index, video_folder):
+        """Return the calling thread's YoutubeDL for a strategy and output folder."""
+        key = (threading.get_ident(), strategy_index, os.path.abspath(video_folder))
+        with self._lock:
+            ydl = self._instances.get(key)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(build_strategy_options(strategy_index, video_folder))
+            with self._lock:
+                self._instances[key] = ydl
+        return ydl
+
+    def close_all(self):
+        """Close every instance (saves cookies, closes connections)."""
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
 
-    for i, strategy in enumerate(strategies, 1):
-        try:
-            # Try strategy silently - errors logged to error_log.txt only
-            # Suppress stderr to hide cookie database errors
-            stderr_suppressor = io.StringIO()
-            with contextlib.redirect_stderr(stderr_suppressor):
-                with yt_dlp.YoutubeDL(strategy) as ydl:
-                    result = ydl.extract_info(link, download=False)
-                    video_title = sanitize_filename(result.get("title", "unknown"))
-                    mp4_file_path = os.path.join(video_folder, f"{video_title}.mp4")
-
-                    # Skip if video already exists
-                    if os.path.exists(mp4_file_path):
-                        print(
-                            f"⏭️ MP4 file already exists, skipping download: {mp4_file_path}"
-                        )
-                        return
 
-                    # Download the video
-                    result = ydl.extract_info(link, download=True)
-                    downloaded_file = ydl.prepare_filename(result)
+YDL_POOL = YoutubeDLPool()
+atexit.register(YDL_POOL.close_all)
 
-                    # Check if re-encoding is needed
-                    if not downloaded_file.endswith(".mp4"):
-                        reencode_to_mp4(downloaded_file, mp4_file_path, ffmpeg_path)
-                    else:
-                        os.rename(downloaded_file, mp4_file_path)
 
-                    # Extract audio to MP3
-                    extract_audio_to_mp3(mp4_file_path, audio_folder, ffmpeg_path)
-                    download_success = True
-                    print(f"✅ Successfully downloaded using strategy {i}")
-                    break
+def log_strategy_error(strategy_index, link, error):
+    """Log a failed strategy to error_log.txt and re-raise errors no strategy can fix."""
+    error_msg = str(error).lower()
+    TECHNICAL_LOGS.append(
+        f"Strategy {strategy_index} error for {link}: {str(error).split('[0;31m')[0] if '[0;31m' in str(error) else str(error)}"
+    )
+    # Only log to error_log.txt, don't print to console
+    # Silent failure - will try next strategy
+
+    # If it's an unsupported URL, skip all strategies
+    if "unsupported url" in error_msg:
+        raise error
+    # For bot detection and other errors, try next strategy
+
+
+def fetch_video_metadata(job):
+    """Find a strategy that can extract the video info.
+
+    Strategies are tried in the order that has worked best for this domain.
+    The info is stored in METADATA_CACHE so the download stage doesn't have to
+    extract it again. The MP4 path is claimed for the job once the title is
+    known. Returns False when the MP4 already exists and the job can be skipped.
+    """
+    link = job["sanitized_link"]
+    domain = get_strategy_domain(link)
+    job["strategy_order"] = STRATEGY_STATS.get_order(domain, len(DOWNLOAD_STRATEGIES))
+    cached = METADATA_CACHE.get(link)
+    if cached is not None:
+        result = cached["info"]
+        strategy_index = cached["strategy_index"]
+    else:
+        result = None
+        with host_slot(job["host"], job):
+            for i in job["strategy_order"]:
+                started = time.monotonic()
+                try:
+                    # Try strategy silently - errors logged to error_log.txt only
+                    # Suppress stderr to hide cookie database errors
+                    with capture_output(stderr=True) as (_, stderr_suppressor):
+                        ydl = YDL_POOL.get(i, job["video_folder"])
+                        result = ydl.extract_info(link, download=False)
+                        # Cookies set by the extractor are needed for the download
+                        METADATA_CACHE.put(link, result, i, ydl.cookiejar)
+
+                    # Capture any stderr output for logging only
+                    stderr_output = stderr_suppressor.getvalue()
+                    if stderr_output:
+                        TECHNICAL_LOGS.append(
+                            f"Strategy {i} stderr for {link}: {stderr_output}"
+                        )
+                except Exception as e:
+                    job["metrics"]["strategy_failures"] += 1
+                    log_strategy_error(i, link, e)
+                    STRATEGY_STATS.record(domain, i, False)
+                    continue
+                strategy_index = i
+                job["strategy_latency"] = time.monotonic() - started
+                break
+
+        if result is None:
+            raise Exception(
+                "All download strategies failed. Video may require manual intervention or be unavailable."
+            )
+
+    video_title = sanitize_filename(result.get("title", "unknown"))
+    mp4_file_path = os.path.join(job["video_folder"], f"{video_title}.mp4")
+    job["strategy_index"] = strategy_index
+    job["mp4_path"] = mp4_file_path
+    job["title"] = result.get("title")
+    if job["media_key"] is None:
+        job["media_key"] = get_media_key_from_info(result)
+
+    # Claimed outside the host slot: the job holding the path may need one to finish
+    started = time.perf_counter()
+    job["output_claim"] = OUTPUT_PATH_CLAIMS.claim(mp4_file_path)
+    add_job_wait(job, "output_path", time.perf_counter() - started)
+
+    # Skip if video already exists
+    if os.path.exists(mp4_file_path):
+        print(f"⏭️ MP4 file already exists, skipping download: {mp4_file_path}")
+        if cached is None:
+            STRATEGY_STATS.record(domain, strategy_index, True)
+        record_job_result(job, "done", video_path=mp4_file_path)
+        return False
+    return True
+
+
+def download_video_file(job):
+    """Download the video, starting with the strategy that extracted its metadata.
+
+    The cached info dict is downloaded directly with process_ie_result; only the
+    fallback strategies extract the info again.
+    """
+    link = job["sanitized_link"]
+    domain = get_strategy_domain(link)
+    cached = METADATA_CACHE.get(link)
+    order = job["strategy_order"] or list(range(1, len(DOWNLOAD_STRATEGIES) + 1))
+    for i in order[order.index(job["strategy_index"]) :]:
+        use_cache = cached is not None and cached["strategy_index"] == i
+        started = time.monotonic()
+        # The progress hooks of the pooled instance report to this job
+        _hook_context.job = job
+        try:
+            with capture_output(stderr=True) as (_, stderr_suppressor):
+                ydl = YDL_POOL.get(i, job["video_folder"])
+                if use_cache:
+                    for cookie in cached["cookies"]:
+                        ydl.cookiejar.set_cookie(cookie)
+                    # process_ie_result adds download details to the dict
+                    result = ydl.process_ie_result(
+                        copy.deepcopy(cached["info"]), download=True
+                    )
+                else:
+                    result = ydl.extract_info(link, download=True)
+                job["downloaded_file"] = ydl.prepare_filename(result)
 
-            # Capture any stderr output for logging only
             stderr_output = stderr_suppressor.getvalue()
             if stderr_output:
                 TECHNICAL_LOGS.append(
                     f"Strategy {i} stderr for {link}: {stderr_output}"
                 )
-
         except Exception as e:
-            error_msg = str(e).lower()
-            TECHNICAL_LOGS.append(
-                f"Strategy {i} error for {link}: {str(e).split('[0;31m')[0] if '[0;31m' in str(e) else str(e)}"
-            )
-            # Only log to error_log.txt, don't print to console
-            # Silent failure - will try next strategy
+            _hook_context.job = None
+            if use_cache:
+                # The cached format URLs may have expired
+                METADATA_CACHE.invalidate(link)
+            job["metrics"]["strategy_failures"] += 1
+            log_strategy_error(i, link, e)
+            STRATEGY_STATS.record(domain, i, False)
+            continue
 
-            # If it's a bot detection error, try next strategy immediately
-            if any(
-                keyword in error_msg
-                for keyword in ["bot", "sign in", "cookies", "authentication"]
-            ):
-                continue
-            # If it's an unsupported URL, skip all strategies
-            elif "unsupported url" in error_msg:
-                raise e
-            # For other errors, try next strategy
-            else:
-                continue
+        _hook_context.job = None
+        latency = time.monotonic() - started
+        if i == job["strategy_index"]:
+            latency += job["strategy_latency"]
+        STRATEGY_STATS.record(domain, i, True, latency)
+        job["strategy_index"] = i
+        print(f"✅ Successfully downloaded using strategy {i}")
+        return
 
-    if not download_success:
-        raise Exception(
-            "All download strategies failed. Video may require manual intervention or be unavailable."
-        )
+    raise Exception(
+        "All download strategies failed. Video may require manual intervention or be unavailable."
+    )
+
+
+def download_video(link, video_folder, audio_folder, ffmpeg_path):
+    """Download video and ensure only MP4 in Videos and MP3 in Audio."""
+    job = create_job(link, 1, 1, video_folder, audio_folder, ffmpeg_path)
+    job["host"] = get_host_key(link)
+    job["kind"] = "photo" if is_tiktok_photo_post(link) else "video"
+    # Same stages as the pipeline, minus link resolution, run in this thread
+    run_job(job, build_download_stages()[1:])
 
 
 def display_ascii_logo():
@@ -761,10 +3220,346 @@ def ensure_megatools():
         return None
 
 
-def download_mega_file(link, video_folder, audio_folder, ffmpeg_path):
-    """Download files from MEGA.nz using megatools - simple and reliable."""
+# Native MEGA downloader: API endpoint, parallel connections per file, bytes
+# fetched per Range request (rounded up to whole MAC chunks) and retries per range
+MEGA_API_URL = "https://g.api.mega.co.nz/cs"
+MEGA_DOWNLOAD_CONNECTIONS = 4
+MEGA_SEGMENT_SIZE = 8 * 1024 * 1024
+MEGA_SEGMENT_RETRIES = 3
+MEGA_REQUEST_TIMEOUT = 60
+# Suffix of the file next to a .partial MEGA download that lists its finished chunks
+MEGA_RESUME_SUFFIX = ".resume"
+
+_MEGA_FILE_LINK_PATTERN = re.compile(
+    r"mega(?:\.co)?\.nz/(?:file/([A-Za-z0-9_-]+)#([A-Za-z0-9_-]+)|#!([A-Za-z0-9_-]+)!([A-Za-z0-9_-]+))"
+)
+
+
+class MegaError(Exception):
+    """The native MEGA downloader could not fetch a link."""
+
+
+def parse_mega_file_link(link):
+    """Return (handle, key) for a public MEGA file link, or None (e.g. folder links)."""
+    match = _MEGA_FILE_LINK_PATTERN.search(link)
+    if not match:
+        return None
+    if match.group(1):
+        return match.group(1), match.group(2)
+    return match.group(3), match.group(4)
+
+
+def _mega_b64decode(data):
+    """Decode MEGA's unpadded URL-safe base64."""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def get_mega_file_key(key_string):
+    """Split a file link's 256-bit key into (aes_key, nonce, meta_mac).
+
+    The AES key is the XOR of the two key halves; the third quarter holds the
+    CTR nonce and the last one the MAC the decrypted file must produce.
+    """
+    key = _mega_b64decode(key_string)
+    if len(key) != 32:
+        raise MegaError("Invalid MEGA file key")
+    words = struct.unpack(">8I", key)
+    aes_key = struct.pack(">4I", *(words[i] ^ words[i + 4] for i in range(4)))
+    return aes_key, key[16:24], key[24:32]
+
+
+def mega_api_request(command):
+    """Send one command to the MEGA API and return its result."""
+    response = get_http_session().post(
+        MEGA_API_URL,
+        params={"id": random.randint(0, 2**31 - 1)},
+        json=[command],
+        timeout=MEGA_REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    result = response.json()
+    # Errors are negative numbers, either bare or as the only list entry
+    if isinstance(result, list):
+        result = result[0]
+    if isinstance(result, int) and result < 0:
+        raise MegaError(f"MEGA API error {result}")
+    return result
+
+
+def decrypt_mega_attributes(encrypted_attributes, aes_key):
+    """Decrypt a node's attribute block (AES-CBC, zero IV) into a dict."""
+    data = _mega_b64decode(encrypted_attributes)
+    data += b"\0" * (-len(data) % 16)
+    plaintext = AES.new(aes_key, AES.MODE_CBC, iv=bytes(16)).decrypt(data)
+    if not plaintext.startswith(b"MEGA{"):
+        raise MegaError("Wrong MEGA key (attributes could not be decrypted)")
+    return json.loads(plaintext[4:].rstrip(b"\0").decode("utf-8", errors="replace"))
+
+
+def get_mega_chunks(size):
+    """Return the (offset, length) MAC chunks of a file: 128 KB, 256 KB, ... then 1 MB each."""
+    chunks = []
+    offset = 0
+    chunk_size = 0x20000
+    while offset + chunk_size < size:
+        chunks.append((offset, chunk_size))
+        offset += chunk_size
+        if chunk_size < 0x100000:
+            chunk_size += 0x20000
+    chunks.append((offset, size - offset))
+    return chunks
+
+
+def get_mega_segments(chunks, segment_size):
+    """Group consecutive chunks into download ranges of at least segment_size bytes."""
+    segments = []
+    current = []
+    current_size = 0
+    for index, (_, length) in enumerate(chunks):
+        current.append(index)
+        current_size += length
+        if current_size >= segment_size:
+            segments.append(current)
+            current = []
+            current_size = 0
+    if current:
+        segments.append(current)
+    return segments
+
+
+def mega_chunk_mac(aes_key, nonce, plaintext):
+    """CBC-MAC of one decrypted chunk, with the nonce repeated twice as IV."""
+    padding = b"\0" * (-len(plaintext) % 16)
+    mac_cipher = AES.new(aes_key, AES.MODE_CBC, iv=nonce + nonce)
+    return mac_cipher.encrypt(bytes(plaintext) + padding)[-16:]
+
+
+def mega_meta_mac(aes_key, chunk_macs):
+    """Combine the chunk MACs (in file order) into the 8-byte MAC stored in the key."""
+    file_mac = AES.new(aes_key, AES.MODE_CBC, iv=bytes(16)).encrypt(b"".join(chunk_macs))[
+        -16:
+    ]
+    words = struct.unpack(">4I", file_mac)
+    return struct.pack(">2I", words[0] ^ words[1], words[2] ^ words[3])
+
+
+def _download_mega_segment(session, url, output_path, aes_key, nonce, chunks, chunk_indexes):
+    """Fetch one Range, decrypt it chunk by chunk at its counter offset and write it in place.
+
+    Returns {chunk index: MAC} for the segment's chunks, once their data has
+    been flushed and fsynced to the file.
+    """
+    start = chunks[chunk_indexes[0]][0]
+    last_offset, last_length = chunks[chunk_indexes[-1]]
+    end = last_offset + last_length
+    # CTR counter = block index within the file (offsets are multiples of 16)
+    cipher = AES.new(aes_key, AES.MODE_CTR, nonce=nonce, initial_value=start // 16)
+
+    with session.get(
+        url,
+        headers={"Range": f"bytes={start}-{end - 1}"},
+        stream=True,
+        timeout=MEGA_REQUEST_TIMEOUT,
+    ) as response:
+        response.raise_for_status()
+        # A 200 is only the right data when the range is the whole file; any
+        # other segment would stream (and discard) the rest of the file
+        whole_file = start == 0 and end == chunks[-1][0] + chunks[-1][1]
+        if response.status_code != 206 and not (
+            whole_file and response.status_code == 200
+        ):
+            raise MegaError(
+                f"MEGA server ignored the Range request (HTTP {response.status_code})"
+            )
+
+        with open(output_path, "r+b") as output:
+            output.seek(start)
+            pending = bytearray()
+            remaining = list(chunk_indexes)
+            segment_macs = {}
+            for data in response.iter_content(chunk_size=256 * 1024):
+                pending += data
+                while remaining and len(pending) >= chunks[remaining[0]][1]:
+                    length = chunks[remaining[0]][1]
+                    plaintext = cipher.decrypt(bytes(pending[:length]))
+                    del pending[:length]
+                    output.write(plaintext)
+                    segment_macs[remaining.pop(0)] = mega_chunk_mac(
+                        aes_key, nonce, plaintext
+                    )
+                if not remaining:
+                    break  # Don't read past the segment
+            if remaining:
+                raise MegaError("MEGA download ended early")
+            # The MACs go into the .resume file, so the data must be on disk first
+            output.flush()
+            os.fsync(output.fileno())
+    return segment_macs
+
+
+def load_mega_resume_state(resume_path, size):
+    """Return {chunk index: MAC} of the chunks an interrupted download finished."""
+    try:
+        with open(resume_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("size") != size:
+            return {}
+        return {int(index): bytes.fromhex(mac) for index, mac in state["chunk_macs"].items()}
+    except (OSError, ValueError, KeyError, AttributeError):
+        return {}
+
+
+def save_mega_resume_state(resume_path, size, finished_macs):
+    """Atomically write the finished chunks' MACs ({chunk index: MAC}) next to the .partial file."""
+    state = {
+        "size": size,
+        "chunk_macs": {str(index): mac.hex() for index, mac in finished_macs.items()},
+    }
+    temp_path = resume_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, resume_path)
+
+
+def download_mega_native(link, output_folder):
+    """Download a public MEGA file link without megatools.
+
+    The file is fetched with MEGA_DOWNLOAD_CONNECTIONS parallel Range requests;
+    each range is decrypted at its own AES-CTR counter offset and written into
+    a preallocated .partial file, and every chunk's MAC is computed as it
+    arrives. The file only gets its real name when the combined MAC matches the
+    one in the link's key. Returns the downloaded file's path.
+
+    Finished chunks are listed in a .resume file, so an interrupted download
+    continues with the missing ranges on the next run.
+    """
+    parsed = parse_mega_file_link(link)
+    if not parsed:
+        raise MegaError("Not a MEGA file link (folders are handled by megatools)")
+    handle, key_string = parsed
+    aes_key, nonce, meta_mac = get_mega_file_key(key_string)
+
+    node = mega_api_request({"a": "g", "g": 1, "ssl": 0, "p": handle})
+    if not isinstance(node, dict) or "g" not in node:
+        raise MegaError("MEGA did not return a download URL")
+    size = int(node["s"])
+    attributes = decrypt_mega_attributes(node["at"], aes_key)
+    filename = sanitize_filename(attributes.get("n") or f"mega_file_{handle}")
+    output_path = os.path.join(output_folder, filename)
+    if os.path.exists(output_path):
+        print(f"⏭️ MEGA file already exists, skipping download: {output_path}")
+        return output_path
+
+    chunks = get_mega_chunks(size)
+    chunk_macs = [None] * len(chunks)
+    partial_path = get_partial_path(output_path)
+    resume_path = partial_path + MEGA_RESUME_SUFFIX
+    resume_lock = threading.Lock()
+
+    # Only chunks of fully written (fsynced) segments are listed in .resume
+    finished = {}
+    if os.path.exists(partial_path) and os.path.getsize(partial_path) == size:
+        finished = {
+            index: mac
+            for index, mac in load_mega_resume_state(resume_path, size).items()
+            if index < len(chunk_macs)
+        }
+    if finished:
+        for index, mac in finished.items():
+            chunk_macs[index] = mac
+        print(f"♻️ Resuming MEGA download: {len(finished)}/{len(chunks)} chunks already done")
+    else:
+        with open(partial_path, "wb") as output:
+            output.truncate(size)  # Preallocate so every range can be written in place
+        save_mega_resume_state(resume_path, size, finished)
+
+    segments = [
+        segment
+        for segment in get_mega_segments(chunks, MEGA_SEGMENT_SIZE)
+        if any(chunk_macs[index] is None for index in segment)
+    ]
+    print(
+        f"⬬ Downloading {filename} ({size / (1024 * 1024):.1f} MB) over"
+        f" {min(MEGA_DOWNLOAD_CONNECTIONS, max(1, len(segments)))} connection(s)..."
+    )
+    started = time.time()
+
+    def fetch(chunk_indexes):
+        for attempt in range(1, MEGA_SEGMENT_RETRIES + 1):
+            try:
+                segment_macs = _download_mega_segment(
+                    session,
+                    node["g"],
+                    partial_path,
+                    aes_key,
+                    nonce,
+                    chunks,
+                    chunk_indexes,
+                )
+                with resume_lock:
+                    finished.update(segment_macs)
+                    for index, mac in segment_macs.items():
+                        chunk_macs[index] = mac
+                    save_mega_resume_state(resume_path, size, finished)
+                return
+            except (requests.RequestException, MegaError) as e:
+                if attempt == MEGA_SEGMENT_RETRIES:
+                    raise MegaError(f"MEGA range download failed: {e}")
+                time.sleep(attempt)
+
+    try:
+        with requests.Session() as session, ThreadPoolExecutor(
+            max_workers=max(1, MEGA_DOWNLOAD_CONNECTIONS), thread_name_prefix="mega"
+        ) as pool:
+            for future in [pool.submit(fetch, segment) for segment in segments]:
+                future.result()
+
+    except BaseException:
+        # Keep the .partial and .resume files: the next run continues from here
+        print("⚠️ MEGA download interrupted; it will resume on the next run")
+        raise
+
+    if mega_meta_mac(aes_key, chunk_macs) != meta_mac:
+        remove_partial_file(output_path)
+        os.remove(resume_path)
+        raise MegaError("MEGA file failed the integrity check (MAC mismatch)")
+
+    os.remove(resume_path)
+    if not os.path.splitext(output_path)[1]:
+        # Some uploads have no extension in their name; read it from the header
+        output_path += detect_media_extension(partial_path)
+    os.replace(partial_path, output_path)
+    elapsed = max(time.time() - started, 1e-6)
+    print(f"✅ MEGA download verified: {filename} ({size / (1024 * 1024) / elapsed:.1f} MB/s)")
+    return output_path
+
+
+# Files from a megatools download that are handed on as the job's video
+MEGA_VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm", ".m4v")
+
+
+def download_mega_file(link, video_folder, audio_folder, ffmpeg_path, extract_audio=True):
+    """Download files from MEGA.nz, natively or with megatools as a fallback.
+
+    File links use the built-in downloader (download_mega_native); folder
+    links, and files it fails on, go through megatools.
+    The pipeline passes extract_audio=False and runs audio extraction in its
+    own stage.
+    """
     print(f"📥 Downloading MEGA file: {link}")
 
+    if parse_mega_file_link(link):
+        try:
+            file_path = download_mega_native(link, video_folder)
+            if extract_audio:
+                extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path)
+            return file_path
+        except (MegaError, requests.RequestException, ValueError, OSError) as e:
+            TECHNICAL_LOGS.append(f"Native MEGA download failed for {link}: {e}")
+            print(f"⚠️ Native MEGA download failed ({e}), trying megatools...")
+
     # Ensure megatools is available
     megatools_exe = ensure_megatools()
     if not megatools_exe:
@@ -775,44 +3570,46 @@ def download_mega_file(link, video_folder, audio_folder, ffmpeg_path):
         print(f"❌ Megatools executable not found: {megatools_exe}")
         return None
 
+    # Each download gets its own staging folder (on the same drive as the
+    # library, so the final move is an atomic rename): the job knows exactly
+    # which files are its own, even with several MEGA downloads running
+    staging_dir = tempfile.mkdtemp(prefix=".mega_staging_", dir=video_folder)
     try:
         # Use megatools dl command to download the file
         print("⬬ Starting MEGA download with megatools...")
 
-        # Run megatools dl command
+        # Run megatools dl command (no timeout: large files take as long as they take)
         result = subprocess.run(
-            [megatools_exe, "dl", "--path", video_folder, link],
+            [megatools_exe, "dl", "--path", staging_dir, link],
             capture_output=True,
             text=True,
-            timeout=300,
         )
 
         if result.returncode == 0:
             print("✅ MEGA download completed successfully!")
 
-            # Find the downloaded file
-            video_files = [
-                f
-                for f in os.listdir(video_folder)
-                if os.path.isfile(os.path.join(video_folder, f))
-                and f.lower().endswith(
-                    (".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm", ".m4v")
-                )
-            ]
+            # Move what this job downloaded into the library (folder links can
+            # contain several files and subfolders)
+            video_files = []
+            for root, _, files in os.walk(staging_dir):
+                for filename in sorted(files):
+                    final_path = os.path.join(video_folder, filename)
+                    if os.path.exists(final_path):
+                        print(f"⏭️ File already exists, keeping it: {filename}")
+                    else:
+                        os.replace(os.path.join(root, filename), final_path)
+                    if filename.lower().endswith(MEGA_VIDEO_EXTENSIONS):
+                        video_files.append(final_path)
 
             if video_files:
-                # Get the most recently modified video file
-                latest_file = max(
-                    [os.path.join(video_folder, f) for f in video_files],
-                    key=os.path.getmtime,
-                )
-
-                print(f"📹 Downloaded file: {os.path.basename(latest_file)}")
+                downloaded_file = video_files[0]
+                print(f"📹 Downloaded file: {os.path.basename(downloaded_file)}")
 
                 # Extract audio if it's a video file
-                extract_audio_to_mp3(latest_file, audio_folder, ffmpeg_path)
+                if extract_audio:
+                    extract_audio_to_mp3(downloaded_file, audio_folder, ffmpeg_path)
 
-                return latest_file
+                return downloaded_file
             else:
                 print("⚠️ Video file not found after download")
                 return None
@@ -821,30 +3618,26 @@ def download_mega_file(link, video_folder, audio_folder, ffmpeg_path):
             print(f"❌ MEGA download failed: {result.stderr}")
             return None
 
-    except subprocess.TimeoutExpired:
-        print("❌ MEGA download timed out")
-        return None
     except Exception as e:
         print(f"❌ MEGA download error: {e}")
         return None
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
 
 
 def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path):
     """Download photo posts with audio using gallery-dl."""
-    if not GALLERY_DL_AVAILABLE:
+    if not is_gallery_dl_available():
         print("❌ Gallery-dl not available. Cannot download photo post audio.")
         raise RuntimeError("Gallery-dl library not available")
 
+    temp_dir = None
     try:
         # Extract photo ID from URL for consistent naming
         photo_id = None
         try:
-            # Resolve shortened URLs first
-            if "vt.tiktok.com" in link or "vm.tiktok.com" in link:
-                response = requests.head(link, allow_redirects=True, timeout=10)
-                resolved_url = response.url
-            else:
-                resolved_url = link
+            # Resolve shortened URLs first (usually already cached)
+            resolved_url = resolve_link(link)
 
             # Extract ID from URL like: https://www.tiktok.com/@user/photo/7498443312253226258
             if "/photo/" in resolved_url:
@@ -852,22 +3645,22 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
         except:
             photo_id = None
 
-        # Generate consistent filename
+        # Generate consistent filename (the extension follows AUDIO_OUTPUT_MODE)
         if photo_id:
-            audio_filename = sanitize_filename(f"tiktok_photo_{photo_id}.mp3")
+            base_name = sanitize_filename(f"tiktok_photo_{photo_id}")
         else:
-            audio_filename = sanitize_filename(f"photo_post_audio_{int(time.time())}.mp3")
-
-        audio_path = os.path.join(audio_folder, audio_filename)
+            base_name = sanitize_filename(f"photo_post_audio_{int(time.time())}")
 
         # CHECK IF ALREADY EXISTS - Skip download if it does
-        if os.path.exists(audio_path):
-            print(f"⏭️ Photo post audio already exists, skipping: {audio_filename}")
-            return  # Exit early - no download needed!
+        existing_audio = find_existing_audio(audio_folder, base_name)
+        if existing_audio:
+            print(
+                f"⏭️ Photo post audio already exists, skipping: {os.path.basename(existing_audio)}"
+            )
+            return existing_audio  # Exit early - no download needed!
 
-        # Create temporary directory for gallery-dl downloads
-        temp_dir = os.path.join(video_folder, "temp_gallery")
-        os.makedirs(temp_dir, exist_ok=True)
+        # Create a temporary directory for this gallery-dl download
+        temp_dir = tempfile.mkdtemp(prefix="temp_gallery_", dir=video_folder)
 
         print("⬬ Starting photo post download...")
 
@@ -876,27 +3669,17 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
         import gallery_dl.job
         import gallery_dl.config
 
-        # Configure gallery-dl
-        gallery_dl.config.set(("extractor",), "base-directory", temp_dir)
-
-        # Capture output
-        from io import StringIO
-        import sys as sys_module
-        old_stdout = sys_module.stdout
-        old_stderr = sys_module.stderr
-        stdout_capture = StringIO()
-        stderr_capture = StringIO()
-
+        # Capture output (per thread, so parallel downloads keep their console)
         try:
-            sys_module.stdout = stdout_capture
-            sys_module.stderr = stderr_capture
-
-            # Run gallery-dl job
-            retcode = gallery_dl.job.DownloadJob(link).run()
-
-            # Restore stdout/stderr
-            sys_module.stdout = old_stdout
-            sys_module.stderr = old_stderr
+            # gallery-dl's config is global, so only one job may run at a time
+            with _gallery_dl_lock, capture_output(stdout=True, stderr=True) as (
+                stdout_capture,
+                stderr_capture,
+            ):
+                # Configure gallery-dl
+                gallery_dl.config.set(("extractor",), "base-directory", temp_dir)
+                # Run gallery-dl job
+                retcode = gallery_dl.job.DownloadJob(link).run()
 
             stdout = stdout_capture.getvalue()
             stderr = stderr_capture.getvalue()
@@ -908,8 +3691,6 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
             })()
 
         except Exception as e:
-            sys_module.stdout = old_stdout
-            sys_module.stderr = old_stderr
             print(f"❌ Gallery-dl error: {e}")
             raise RuntimeError(f"Photo post download failed: {e}")
 
@@ -937,22 +3718,29 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
 
                 # Check for audio/video files
                 if file_ext in [".mp4", ".m4a", ".mp3", ".wav", ".aac"]:
-                    # Use the pre-determined filename (already set above)
-                    print(f"🎵 Extracting audio from photo post...")
-                    subprocess.run(
+                    # Use the pre-determined name (already set above)
+                    audio_codec = get_stream_codec(
+                        probe_media_streams(file_path, ffmpeg_path), "audio"
+                    )
+                    extension, codec_args, description = plan_audio_output(audio_codec)
+                    audio_filename = base_name + extension
+                    audio_path = os.path.join(audio_folder, audio_filename)
+                    print(f"🎵 Extracting audio from photo post ({description})...")
+                    returncode = run_ffmpeg(
+                        ffmpeg_path,
+                        file_path,
                         [
-                            ffmpeg_path,
-                            "-y",
-                            "-i",
-                            file_path,
-                            "-q:a",
-                            "0",
-                            "-map",
-                            "a",
-                            audio_path,
+                            (
+                                ["-map", "0:a:0", "-vn", *codec_args],
+                                get_partial_path(audio_path),
+                            )
                         ],
-                        capture_output=True,
+                        description=f"Audio {audio_filename}",
                     )
+                    if returncode == 0:
+                        commit_partial_file(audio_path)
+                    else:
+                        remove_partial_file(audio_path)
 
                     if os.path.exists(audio_path):
                         print(f"✅ Audio extracted: {audio_filename}")
@@ -964,6 +3752,8 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
 
             if not audio_extracted:
                 print("⚠️ No audio found in photo post")
+                return None
+            return audio_path
 
         else:
             print(f"❌ Gallery-dl failed: {result.stderr}")
@@ -971,8 +3761,7 @@ def download_photo_post_with_audio(link, video_folder, audio_folder, ffmpeg_path
 
     except Exception as e:
         # Clean up temp directory if it exists
-        temp_dir = os.path.join(video_folder, "temp_gallery")
-        if os.path.exists(temp_dir):
+        if temp_dir and os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
         raise RuntimeError(f"Photo post download failed: {e}")
 
@@ -1027,34 +3816,100 @@ def process_downloaded_file(
         print(f"Note: Unknown file type '{file_ext}' - saved to Videos folder")
 
 
-def detect_duplicates_simple(links):
-    """Detect duplicate links using simple string comparison and URL normalization."""
-    seen_links = set()
-    unique_links = []
-    duplicates = []
+def get_dedupe_key(link):
+    """Return the key duplicates are compared by: extractor and media ID if known."""
+    canonical = canonicalize_link(link)
+    if canonical:
+        return f"{canonical[0]}:{canonical[1]}"
+    # Other YouTube links (playlists, channels) are told apart by their query string
+    if "youtube.com" in link or "youtu.be" in link:
+        return link
+    # For other links, normalize by removing trailing parameters but keeping the core
+    return link.split("?")[0].split("#")[0] if "#" not in link else link
 
-    print("🔍 Checking for duplicate links...")
 
-    for i, link in enumerate(links):
-        link = link.strip()
-        if not link:
-            continue
+# Library index: file names of the Videos/Audio folders, stored next to the script
+LIBRARY_INDEX_FILE_NAME = "library_index.json"
+# A folder listing is only reused when the folder's mtime is at least this many
+# seconds older than the listing (coarse timestamps could hide a later change)
+LIBRARY_INDEX_MTIME_SLACK = 2
 
-        # Normalize the link
-        if "youtube.com" in link or "youtu.be" in link:
-            normalized = sanitize_youtube_link(link)
-        else:
-            # For MEGA and other links, normalize by removing trailing parameters but keeping the core
-            normalized = link.split("?")[0].split("#")[0] if "#" not in link else link
 
-        if normalized in seen_links:
-            duplicates.append((i, link))
-            print(f"   🔄 Found duplicate link #{i + 1}: {link[:60]}...")
-        else:
-            seen_links.add(normalized)
-            unique_links.append(link)
+class LibraryIndex:
+    """Names of the files in the library folders, kept between runs.
+
+    A folder is only listed again (with os.scandir, which needs no stat per
+    file) when its mtime changed; adding, removing or renaming a file always
+    updates the folder's mtime. Loaded lazily and saved as JSON.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._folders = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._folders is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._folders = json.load(f)
+            except (OSError, ValueError):
+                self._folders = {}
+        return self._folders
+
+    def list_files(self, folder):
+        """Return the set of file names in a folder."""
+        folder = os.path.abspath(folder)
+        mtime_ns = os.stat(folder).st_mtime_ns
+        with self._lock:
+            entry = self._load().get(folder)
+            if (
+                entry is not None
+                and entry["mtime_ns"] == mtime_ns
+                and entry["scanned_ns"] - mtime_ns > LIBRARY_INDEX_MTIME_SLACK * 1e9
+            ):
+                return set(entry["files"])
+
+        scanned_ns = time.time_ns()
+        with os.scandir(folder) as entries:
+            files = sorted(entry.name for entry in entries if entry.is_file())
+        with self._lock:
+            self._load()[folder] = {
+                "mtime_ns": mtime_ns,
+                "scanned_ns": scanned_ns,
+                "files": files,
+            }
+            self._dirty = True
+        return set(files)
+
+    def save(self):
+        """Write the index to disk (atomically) if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._folders)
+            self._dirty = False
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            TECHNICAL_LOGS.append(f"Could not save library index: {e}")
+
+
+LIBRARY_INDEX = LibraryIndex(os.path.join(get_base_dir(), LIBRARY_INDEX_FILE_NAME))
 
-    return unique_links, duplicates
+
+def get_audio_base_names(audio_folder):
+    """Base names (without extension) of the extracted audio files in a folder."""
+    return {
+        os.path.splitext(filename)[0]
+        for filename in LIBRARY_INDEX.list_files(audio_folder)
+        if os.path.splitext(filename)[1].lower() in AUDIO_OUTPUT_EXTENSIONS
+        and not is_partial_file(filename)
+    }
 
 
 def extract_missing_audio_files(video_folder, audio_folder, ffmpeg_path):
@@ -1062,59 +3917,59 @@ def extract_missing_audio_files(video_folder, audio_folder, ffmpeg_path):
     video_extensions = [".mp4", ".avi", ".mkv", ".mov", ".webm", ".flv", ".wmv"]
 
     # Find all video files
-    video_files = []
-    for filename in os.listdir(video_folder):
-        file_path = os.path.join(video_folder, filename)
-        if os.path.isfile(file_path):
-            file_ext = os.path.splitext(filename)[1].lower()
-            if file_ext in video_extensions:
-                video_files.append((file_path, filename))
+    video_files = {
+        os.path.splitext(filename)[0]: filename
+        for filename in sorted(LIBRARY_INDEX.list_files(video_folder))
+        if os.path.splitext(filename)[1].lower() in video_extensions
+        and not is_partial_file(filename)
+    }
 
     if not video_files:
         return
 
-    # Check which videos are missing MP3 files
-    missing_audio = []
-    for file_path, filename in video_files:
-        base_name = os.path.splitext(filename)[0]
-        mp3_filename = base_name + ".mp3"
-        mp3_path = os.path.join(audio_folder, mp3_filename)
-
-        if not os.path.exists(mp3_path):
-            missing_audio.append((file_path, filename, mp3_filename))
+    # Videos missing audio files: one set difference on the base names
+    missing_audio = [
+        (os.path.join(video_folder, video_files[base_name]), video_files[base_name])
+        for base_name in sorted(video_files.keys() - get_audio_base_names(audio_folder))
+    ]
 
     if not missing_audio:
-        print("✅ All video files already have corresponding MP3 files!")
+        print("✅ All video files already have corresponding audio files!")
         return
 
     print(
-        f"🎵 Found {len(missing_audio)} video(s) missing MP3 files. Extracting now..."
+        f"🎵 Found {len(missing_audio)} video(s) missing audio files. Extracting now..."
     )
 
-    for file_path, filename, mp3_filename in missing_audio:
+    def extract(file_path, filename):
         try:
             print(f"🎵 Extracting audio from: {filename}")
-            extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path)
-            print(f"✅ Created: {mp3_filename}")
+            audio_path = extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path)
+            print(f"✅ Created: {os.path.basename(audio_path)}")
         except Exception as e:
             TECHNICAL_LOGS.append(f"❌ Failed to extract audio from {filename}: {e}")
 
+    # Extract in parallel; the FFmpeg executor limits how many run at once
+    with ThreadPoolExecutor(max_workers=FFMPEG_EXECUTOR.max_jobs) as pool:
+        for file_path, filename in missing_audio:
+            pool.submit(extract, file_path, filename)
+
 
 def cleanup_misplaced_audio_files(video_folder, audio_folder, ffmpeg_path):
     """Clean up any audio files that are in the Videos folder - convert to MP3 and move to Audio folder."""
     audio_extensions = [".m4a", ".aac", ".wav", ".flac", ".ogg", ".mp3"]
 
     # Find all audio files in Videos folder
-    misplaced_audio_files = []
-    for filename in os.listdir(video_folder):
-        file_path = os.path.join(video_folder, filename)
-        if os.path.isfile(file_path):
-            file_ext = os.path.splitext(filename)[1].lower()
-            if file_ext in audio_extensions:
-                misplaced_audio_files.append((file_path, filename))
+    misplaced_audio_files = [
+        (os.path.join(video_folder, filename), filename)
+        for filename in sorted(LIBRARY_INDEX.list_files(video_folder))
+        if os.path.splitext(filename)[1].lower() in audio_extensions
+        and not is_partial_file(filename)
+    ]
 
     if not misplaced_audio_files:
         return
+    audio_base_names = get_audio_base_names(audio_folder)
 
     print(
         f"\n🧹 Found {len(misplaced_audio_files)} audio file(s) in Videos folder that need cleanup..."
@@ -1123,93 +3978,165 @@ def cleanup_misplaced_audio_files(video_folder, audio_folder, ffmpeg_path):
     for file_path, filename in misplaced_audio_files:
         try:
             base_name = os.path.splitext(filename)[0]
-            mp3_filename = base_name + ".mp3"
-            mp3_path = os.path.join(audio_folder, mp3_filename)
 
             print(f"🎵 Processing misplaced audio file: {filename}")
 
-            if os.path.exists(mp3_path):
-                print(f"⏭️ MP3 already exists in Audio folder: {mp3_filename}")
+            if base_name in audio_base_names:
+                print(f"⏭️ Audio already exists in Audio folder: {base_name}")
                 os.remove(file_path)
             else:
-                print(f"🎵 Converting to MP3 and moving to Audio folder...")
-                extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path)
+                print(f"🎵 Converting and moving to Audio folder...")
+                audio_path = extract_audio_to_mp3(file_path, audio_folder, ffmpeg_path)
                 os.remove(file_path)
-                print(f"✅ Converted and moved: {filename} → {mp3_filename}")
+                print(
+                    f"✅ Converted and moved: {filename} → {os.path.basename(audio_path)}"
+                )
 
         except Exception as e:
             TECHNICAL_LOGS.append(f"❌ Error processing {filename}: {e}")
 
 
-def detect_and_rename_mega_file(temp_filepath, file_id, output_folder):
-    """Detect file type and rename MEGA download with proper extension."""
+# Bytes read from the start of a file to recognise its container
+MEDIA_SNIFF_SIZE = 64 * 1024
+
+# ISO base media (MP4 family) major brands that have their own extension
+_FTYP_BRAND_EXTENSIONS = {
+    b"qt  ": ".mov",
+    b"M4A ": ".m4a",
+    b"M4B ": ".m4a",
+    b"M4V ": ".m4v",
+    b"M4VH": ".m4v",
+    b"M4VP": ".m4v",
+    b"3gp4": ".3gp",
+    b"3gp5": ".3gp",
+    b"3gp6": ".3gp",
+    b"3g2a": ".3g2",
+}
+
+# First name of FFmpeg's format_name (e.g. "mov,mp4,m4a,3gp,3g2,mj2") -> extension
+_FFMPEG_FORMAT_EXTENSIONS = {
+    "mov": ".mp4",
+    "matroska": ".mkv",
+    "avi": ".avi",
+    "flv": ".flv",
+    "asf": ".wmv",
+    "mpegts": ".ts",
+    "mp3": ".mp3",
+    "aac": ".aac",
+    "ogg": ".ogg",
+    "flac": ".flac",
+    "wav": ".wav",
+}
+
+
+def _read_ebml_doctype(header):
+    """Return the DocType ("webm", "matroska") from an EBML header, or None."""
+    position = header.find(b"\x42\x82", 4, 64)
+    if position < 0 or position + 2 >= len(header):
+        return None
+    size_byte = header[position + 2]
+    if not size_byte & 0x80:
+        return None  # Only the one-byte size form is used for DocType in practice
+    size = size_byte & 0x7F
+    start = position + 3
+    return header[start : start + size].rstrip(b"\0").decode("ascii", errors="replace")
+
+
+def sniff_media_type(file_path):
+    """Guess a media file's extension from its first bytes (None if unknown).
+
+    Only MEDIA_SNIFF_SIZE bytes are read, so this takes the same time for any
+    file size.
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(MEDIA_SNIFF_SIZE)
+
+    if header[4:8] == b"ftyp":
+        return _FTYP_BRAND_EXTENSIONS.get(header[8:12], ".mp4")
+    if header[4:8] in (b"moov", b"mdat", b"free", b"wide"):
+        return ".mov"  # Old QuickTime files without an ftyp box
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return ".webm" if _read_ebml_doctype(header) == "webm" else ".mkv"
+    if header.startswith(b"RIFF"):
+        return {b"AVI ": ".avi", b"WAVE": ".wav"}.get(header[8:12])
+    if header.startswith(b"FLV"):
+        return ".flv"
+    if header.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+        return ".wmv"  # ASF
+    if header.startswith(b"OggS"):
+        return ".opus" if b"OpusHead" in header[:512] else ".ogg"
+    if header.startswith(b"fLaC"):
+        return ".flac"
+    if header.startswith(b"ID3"):
+        return ".mp3"
+    if len(header) > 376 and header[0] == header[188] == header[376] == 0x47:
+        return ".ts"  # MPEG transport stream: sync byte every 188 bytes
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # MPEG audio frame sync: layer bits 00 mean ADTS AAC, otherwise MP3
+        return ".aac" if header[1] & 0x06 == 0 else ".mp3"
+    return None
+
+
+def probe_container_format(file_path, ffmpeg_path):
+    """Ask FFmpeg for a file's container, reading only its header (None on failure)."""
+    ffprobe_path = get_ffmpeg_capabilities(ffmpeg_path).ffprobe_path
     try:
-        print("🔍 Analyzing downloaded MEGA file...")
+        if ffprobe_path:
+            result = subprocess.run(
+                [
+                    ffprobe_path,
+                    "-v", "error",
+                    "-probesize", str(MEDIA_SNIFF_SIZE * 16),
+                    "-show_entries", "format=format_name",
+                    "-of", "json",
+                    file_path,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=30,
+            )
+            return json.loads(result.stdout or "{}").get("format", {}).get("format_name")
 
-        # First, try using FFmpeg to probe the file (works even on encrypted MEGA files sometimes)
-        ffmpeg_path = get_ffmpeg_path()
-        if ffmpeg_path:
-            try:
-                probe_cmd = [ffmpeg_path, "-i", temp_filepath, "-f", "null", "-"]
-                result = subprocess.run(
-                    probe_cmd, capture_output=True, text=True, timeout=30
-                )
+        # Without an output file FFmpeg only reads the header and exits
+        result = subprocess.run(
+            [
+                ffmpeg_path,
+                "-hide_banner",
+                "-probesize", str(MEDIA_SNIFF_SIZE * 16),
+                "-i", file_path,
+            ],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=30,
+        )
+        match = re.search(r"Input #0, ([\w,]+), from", result.stderr)
+        return match.group(1) if match else None
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
 
-                # Check FFmpeg output for format information
-                output_text = result.stderr.lower()
-
-                if (
-                    "mp4" in output_text
-                    or "h264" in output_text
-                    or "aac" in output_text
-                ):
-                    file_extension = ".mp4"
-                elif "matroska" in output_text or "mkv" in output_text:
-                    file_extension = ".mkv"
-                elif "avi" in output_text:
-                    file_extension = ".avi"
-                elif "quicktime" in output_text or "mov" in output_text:
-                    file_extension = ".mov"
-                elif "webm" in output_text:
-                    file_extension = ".webm"
-                elif "mp3" in output_text:
-                    file_extension = ".mp3"
-                else:
-                    # If FFmpeg can't identify it, assume it's a video
-                    file_extension = ".mp4"
 
-                print(f"📹 FFmpeg detected format: {file_extension}")
+def detect_media_extension(file_path, ffmpeg_path=None):
+    """Return the extension for a media file from its header (".mp4" if unknown)."""
+    extension = sniff_media_type(file_path)
+    if extension is None and ffmpeg_path:
+        format_name = probe_container_format(file_path, ffmpeg_path)
+        if format_name:
+            extension = _FFMPEG_FORMAT_EXTENSIONS.get(format_name.split(",")[0])
+    return extension or ".mp4"
 
-            except Exception as e:
-                print(f"⚠️ FFmpeg probe failed: {e}")
-                file_extension = ".mp4"  # Default to MP4
-        else:
-            # No FFmpeg available, try basic file analysis
-            print("⚠️ FFmpeg not available, using basic detection...")
-
-            # Read first few bytes to detect file type
-            with open(temp_filepath, "rb") as f:
-                header = f.read(16)
-
-            # Check if it looks like an encrypted MEGA file (random bytes)
-            # If so, assume it's a video and try .mp4
-            if len(set(header)) > 8:  # High entropy suggests encryption
-                file_extension = ".mp4"
-                print("🔐 File appears encrypted, assuming MP4")
-            else:
-                # Try basic magic bytes detection
-                if header.startswith(b"\x00\x00\x00\x18ftypmp4") or header.startswith(
-                    b"\x00\x00\x00\x20ftypiso"
-                ):
-                    file_extension = ".mp4"
-                elif header.startswith(b"\x1a\x45\xdf\xa3"):  # Matroska/WebM
-                    file_extension = ".mkv"
-                elif header.startswith(b"RIFF") and b"AVI " in header:
-                    file_extension = ".avi"
-                elif header.startswith(b"ID3") or header.startswith(b"\xff\xfb"):
-                    file_extension = ".mp3"
-                else:
-                    file_extension = ".mp4"  # Default fallback
+
+def detect_and_rename_mega_file(temp_filepath, file_id, output_folder):
+    """Detect file type and rename MEGA download with proper extension.
+
+    Only the file header is read (sniff_media_type, then a header-limited
+    FFmpeg probe), so this takes the same time for any file size.
+    """
+    try:
+        print("🔍 Analyzing downloaded MEGA file...")
+        file_extension = detect_media_extension(temp_filepath, get_ffmpeg_path())
+        print(f"📹 Detected format: {file_extension}")
 
         # Generate new filename with proper extension
         new_filename = f"mega_file_{file_id}{file_extension}"
@@ -1235,8 +4162,55 @@ def detect_and_rename_mega_file(temp_filepath, file_id, output_folder):
             return temp_filepath
 
 
-def decrypt_mega_file(encrypted_filepath, key_string, output_folder, file_id):
-    """Decrypt MEGA file using the key from the URL."""
+# Bytes decrypted per step (a multiple of the 16-byte AES block); memory use
+# stays at about two chunks whatever the file size
+MEGA_DECRYPT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def decrypt_stream(cipher, source, destination, chunk_size=None, use_mmap=False):
+    """Decrypt an open file into another in fixed-size chunks.
+
+    The input is read into (or, with use_mmap, mapped instead of read) one
+    reusable buffer and decrypted into a second one, so no per-chunk objects
+    are created. Returns the number of bytes written.
+    """
+    chunk_size = chunk_size or MEGA_DECRYPT_CHUNK_SIZE
+    output_view = memoryview(bytearray(chunk_size))
+    total = 0
+
+    if use_mmap:
+        size = os.fstat(source.fileno()).st_size
+        if size == 0:
+            return 0  # Empty files can't be mapped
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as mapped_view:
+                for offset in range(0, size, chunk_size):
+                    with mapped_view[offset : offset + chunk_size] as chunk:
+                        output = output_view[: len(chunk)]
+                        cipher.decrypt(chunk, output=output)
+                        destination.write(output)
+                        total += len(chunk)
+        return total
+
+    input_view = memoryview(bytearray(chunk_size))
+    while True:
+        read = source.readinto(input_view)
+        if not read:
+            return total
+        output = output_view[:read]
+        cipher.decrypt(input_view[:read], output=output)
+        destination.write(output)
+        total += read
+
+
+def decrypt_mega_file(
+    encrypted_filepath, key_string, output_folder, file_id, use_mmap=False
+):
+    """Decrypt MEGA file using the key from the URL.
+
+    Decrypts in MEGA_DECRYPT_CHUNK_SIZE chunks, so memory use does not grow
+    with the file size.
+    """
     try:
         print("🔓 Decrypting MEGA file...")
 
@@ -1246,22 +4220,17 @@ def decrypt_mega_file(encrypted_filepath, key_string, output_folder, file_id):
         # MEGA uses the first 16 bytes as AES key
         aes_key = key_bytes[:16]
 
-        # Read encrypted file
-        with open(encrypted_filepath, "rb") as f:
-            encrypted_data = f.read()
-
         # MEGA uses AES-128-CTR encryption
         # Initialize counter (MEGA uses a specific counter format)
         counter = Counter.new(128, initial_value=0)
         cipher = AES.new(aes_key, AES.MODE_CTR, counter=counter)
 
-        # Decrypt the data
-        decrypted_data = cipher.decrypt(encrypted_data)
-
-        # Save decrypted file temporarily
+        # Decrypt into a temporary file chunk by chunk
         temp_decrypted = os.path.join(output_folder, f"decrypted_temp_{file_id}.tmp")
-        with open(temp_decrypted, "wb") as f:
-            f.write(decrypted_data)
+        with open(encrypted_filepath, "rb") as source, open(
+            temp_decrypted, "wb"
+        ) as destination:
+            decrypt_stream(cipher, source, destination, use_mmap=use_mmap)
 
         print("✅ File decrypted successfully!")
         return temp_decrypted
@@ -1304,6 +4273,9 @@ if __name__ == "__main__":
     print("Video links downloader - v4.1")
     print("============================================================")
 
+    # --watch: keep running and download links as they are appended to links.txt
+    watch = "--watch" in sys.argv[1:]
+
     links_file = "links.txt"
     if not os.path.exists(links_file):
         example_file = "links.txt.example"
@@ -1323,19 +4295,20 @@ if __name__ == "__main__":
             print(
                 f"📝 Created '{links_file}' - Please add your video links and run again."
             )
-            print("\n" + "=" * 60)
-            print("⚠️  FIRST RUN SETUP COMPLETE")
-            print("=" * 60)
-            print("\nNext steps:")
-            print("1. Open 'links.txt' in a text editor")
-            print("2. Add your video links (one per line)")
-            print("3. Run this program again")
-            print("\nThe program will now exit...")
-            print("=" * 60)
-            input("\nPress ENTER to close...")
-            sys.exit(0)
+            if not watch:
+                print("\n" + "=" * 60)
+                print("⚠️  FIRST RUN SETUP COMPLETE")
+                print("=" * 60)
+                print("\nNext steps:")
+                print("1. Open 'links.txt' in a text editor")
+                print("2. Add your video links (one per line)")
+                print("3. Run this program again")
+                print("\nThe program will now exit...")
+                print("=" * 60)
+                input("\nPress ENTER to close...")
+                sys.exit(0)
     try:
-        download_videos_and_audio(links_file)
+        download_videos_and_audio(links_file, watch=watch)
     except KeyboardInterrupt:
         print("\n\n⚠️ Download interrupted by user.")
     except Exception as e:
@@ -1346,4 +4319,5 @@ if __name__ == "__main__":
         print("\n" + "=" * 60)
         print("✅ Program finished!")
         print("=" * 60)
-        input("\nPress ENTER to close this window...")
+        if not watch:
+            input("\nPress ENTER to close this window...")
@@ -0,0 +1,157 @@
+"""
+Link Canonicalization Benchmark
+===============================
+Generates a large mix of YouTube, TikTok, MEGA and other links in the forms
+people paste (watch, youtu.be, shorts, live, embed, m./music. hosts, tracking
+parameters, photo posts, short links) and measures how many links per second
+canonicalize_link() and get_dedupe_key() handle, next to the previous
+approach (uncompiled sanitize regexes plus a separate media-key search).
+Also checks that every form of the same video maps to one key.
+
+Usage:
+    python benchmarks/bench_canonicalize.py [--count N] [--runs N]
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import string
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import LRGEX_Video_Downloader as app  # noqa: E402
+
+ID_CHARACTERS = string.ascii_letters + string.digits + "-_"
+
+# Forms of a YouTube link to the same video ({} is the 11-character ID)
+YOUTUBE_FORMS = [
+    "https://www.youtube.com/watch?v={}",
+    "https://youtube.com/watch?v={}&list=PLx&index=3",
+    "https://m.youtube.com/watch?v={}&t=42s",
+    "https://music.youtube.com/watch?v={}&feature=share",
+    "https://www.youtube.com/shorts/{}?feature=share",
+    "https://www.youtube.com/live/{}?si=abc",
+    "https://www.youtube.com/embed/{}?start=10",
+    "https://youtu.be/{}?si=abcdef",
+    "https://www.youtube.com/watch?feature=youtu.be&v={}",
+]
+TIKTOK_FORMS = [
+    "https://www.tiktok.com/@some.user/video/{}",
+    "https://www.tiktok.com/@some.user/video/{}?is_from_webapp=1&sender_device=pc",
+    "https://m.tiktok.com/@some.user/video/{}",
+]
+OTHER_FORMS = [
+    "https://www.tiktok.com/@some.user/photo/{}?lang=en",
+    "https://vm.tiktok.com/ZM{}/",
+    "https://mega.nz/file/{}#key0123456789",
+    "https://www.youtube.com/playlist?list=PL{}",
+    "https://example.com/media/{}?ref=feed",
+]
+
+
+def legacy_dedupe_and_media_key(link):
+    """The previous per-link work: sanitize (uncompiled regexes), then a media-key search."""
+    if "youtube.com/watch" in link or "youtu.be/" in link:
+        if "youtube.com/watch" in link:
+            link_work = re.sub(r"\?\?+", "?", link)
+            link_work = re.sub(r"(\?v=[^&?]+)\?", r"\1&", link_work)
+            for pattern in (
+                r"[?&]v=([a-zA-Z0-9_-]{11})",
+                r"[?&]v=([a-zA-Z0-9_-]+)",
+                r"/watch\?v=([a-zA-Z0-9_-]+)",
+            ):
+                video_id = re.search(pattern, link_work)
+                if video_id:
+                    link = f"https://youtube.com/watch?v={video_id.group(1)}"
+                    break
+        else:
+            video_id = re.search(r"youtu\.be/([^?&]+)", link)
+            if video_id:
+                link = f"https://youtube.com/watch?v={video_id.group(1)}"
+    elif "tiktok.com" in link and "/video/" in link:
+        video_id = re.search(r"/video/(\d+)", link)
+        if video_id:
+            link = f"https://www.tiktok.com/@user/video/{video_id.group(1)}"
+    for pattern in (
+        r"(?:youtube\.com/watch\?(?:[^#]*&)?v=|youtu\.be/)([A-Za-z0-9_-]{11})",
+        r"tiktok\.com/.*?/(?:video|photo)/(\d+)",
+        r"mega(?:\.co)?\.nz/(?:file/|#!)([A-Za-z0-9_-]+)",
+    ):
+        match = re.search(pattern, link)
+        if match:
+            return link, match.group(1)
+    return link, None
+
+
+def make_links(count, seed=1):
+    """Return count links: 60% YouTube, 25% TikTok videos, 15% other forms."""
+    rng = random.Random(seed)
+    links = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            media_id = "".join(rng.choices(ID_CHARACTERS, k=11))
+            links.append(rng.choice(YOUTUBE_FORMS).format(media_id))
+        elif roll < 0.85:
+            links.append(rng.choice(TIKTOK_FORMS).format(rng.randrange(10**18, 10**19)))
+        else:
+            links.append(rng.choice(OTHER_FORMS).format(rng.randrange(10**8, 10**9)))
+    return links
+
+
+def check_equivalence():
+    """Every form of one video must give the same key; returns a list of problems."""
+    problems = []
+    for forms, media_id, expected in (
+        (YOUTUBE_FORMS, "dQw4w9WgXcQ", ("youtube", "dQw4w9WgXcQ")),
+        (TIKTOK_FORMS, "7234567890123456789", ("tiktok", "7234567890123456789")),
+    ):
+        for form in forms:
+            link = form.format(media_id)
+            canonical = app.canonicalize_link(link)
+            if canonical is None or canonical[:2] != expected:
+                problems.append(f"{link} -> {canonical}")
+    return problems
+
+
+def links_per_second(function, links, runs):
+    """Median throughput of calling function on every link."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for link in links:
+            function(link)
+        timings.append(time.perf_counter() - started)
+    return len(links) / statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    problems = check_equivalence()
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("Equivalent link forms map to one key: OK")
+
+    links = make_links(args.count)
+    print(f"{'function':<28} {'links/s':>12}")
+    for name, function in (
+        ("canonicalize_link", app.canonicalize_link),
+        ("get_dedupe_key", app.get_dedupe_key),
+        ("previous sanitize + key", legacy_dedupe_and_media_key),
+    ):
+        print(f"{name:<28} {links_per_second(function, links, args.runs):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+MEGA Decryption Benchmark
+=========================
+Encrypts a synthetic file with AES-128-CTR (as MEGA does) and measures how
+fast decrypt_mega_file() turns it back into plaintext, with regular reads and
+with mmap input, next to the old read-everything-at-once approach. Each
+variant runs in its own interpreter so its peak memory can be reported too
+(for mmap that includes the mapped file pages, which the OS can drop at will).
+
+Usage:
+    python benchmarks/bench_mega_decrypt.py [--size-mb N] [--runs N] [--chunk-mb N]
+"""
+
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+VARIANTS = ["whole-file", "chunked", "chunked-mmap"]
+
+# Fixed test key (16 bytes, URL-safe base64 like a MEGA link's key)
+KEY_STRING = base64.urlsafe_b64encode(bytes(range(16))).decode().rstrip("=")
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_encrypted_file(path, size_mb):
+    """Write size_mb of random data encrypted the way MEGA files are."""
+    from Crypto.Cipher import AES
+    from Crypto.Util import Counter
+
+    key = base64.urlsafe_b64decode(KEY_STRING + "==")[:16]
+    cipher = AES.new(key, AES.MODE_CTR, counter=Counter.new(128, initial_value=0))
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(cipher.encrypt(os.urandom(1024 * 1024)))
+
+
+def decrypt_whole_file(encrypted_path, output_folder):
+    """The previous implementation: read, decrypt and write the whole file at once."""
+    from Crypto.Cipher import AES
+    from Crypto.Util import Counter
+
+    key = base64.urlsafe_b64decode(KEY_STRING + "==")[:16]
+    with open(encrypted_path, "rb") as f:
+        encrypted_data = f.read()
+    cipher = AES.new(key, AES.MODE_CTR, counter=Counter.new(128, initial_value=0))
+    decrypted_data = cipher.decrypt(encrypted_data)
+    output_path = os.path.join(output_folder, "decrypted_temp_bench.tmp")
+    with open(output_path, "wb") as f:
+        f.write(decrypted_data)
+    return output_path
+
+
+def run_variant(variant, encrypted_path, output_folder, chunk_mb):
+    """Decrypt once with one variant (in this process) and return the measurements."""
+    import contextlib
+    import io
+
+    import LRGEX_Video_Downloader as app
+
+    app.MEGA_DECRYPT_CHUNK_SIZE = chunk_mb * 1024 * 1024
+    baseline_rss = peak_rss_mb()
+    started = time.perf_counter()
+    if variant == "whole-file":
+        output_path = decrypt_whole_file(encrypted_path, output_folder)
+    else:
+        with contextlib.redirect_stdout(io.StringIO()):
+            output_path = app.decrypt_mega_file(
+                encrypted_path,
+                KEY_STRING,
+                output_folder,
+                "bench",
+                use_mmap=variant == "chunked-mmap",
+            )
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(output_path)
+    os.remove(output_path)
+    peak_rss = peak_rss_mb()
+    return {
+        "elapsed": elapsed,
+        "size": size,
+        "peak_rss_growth_mb": None if peak_rss is None else peak_rss - baseline_rss,
+    }
+
+
+def measure(variant, encrypted_path, output_folder, chunk_mb):
+    """Run one variant in a fresh interpreter and return its measurements."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            variant,
+            encrypted_path,
+            output_folder,
+            str(chunk_mb),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        variant, encrypted_path, output_folder, chunk_mb = sys.argv[2:6]
+        print(json.dumps(run_variant(variant, encrypted_path, output_folder, int(chunk_mb))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--chunk-mb", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_mega_") as work_dir:
+        encrypted_path = os.path.join(work_dir, "encrypted.bin")
+        print(f"Creating {args.size_mb} MB encrypted test file...")
+        make_encrypted_file(encrypted_path, args.size_mb)
+
+        print(f"{'variant':<14} {'MB/s':>8} {'peak RSS growth':>16}")
+        for variant in VARIANTS:
+            results = [
+                measure(variant, encrypted_path, work_dir, args.chunk_mb)
+                for _ in range(args.runs)
+            ]
+            elapsed = statistics.median(r["elapsed"] for r in results)
+            throughput = results[0]["size"] / (1024 * 1024) / elapsed
+            if results[0]["peak_rss_growth_mb"] is None:
+                rss_growth = "n/a"
+            else:
+                rss_growth = f"{max(r['peak_rss_growth_mb'] for r in results):.1f} MB"
+            print(f"{variant:<14} {throughput:>8.1f} {rss_growth:>16}")
+
+
+if __name__ == "__main__":
+    main()
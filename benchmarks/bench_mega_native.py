@@ -0,0 +1,199 @@
+"""
+Native MEGA Downloader Benchmark
+================================
+Runs download_mega_native() against a local HTTP stand-in for MEGA: the
+server answers the API's "g" command and serves an AES-CTR-encrypted
+fixture with Range support, optionally throttled per connection to mimic
+MEGA's per-connection speed limits. Reports MB/s for several connection
+counts, checks the decrypted file against the original, and checks that a
+corrupted download is rejected by the MAC check.
+
+Usage:
+    python benchmarks/bench_mega_native.py [--size-mb N] [--connections 1,2,4,8]
+                                           [--per-connection-mbps N]
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from Crypto.Cipher import AES  # noqa: E402
+
+import LRGEX_Video_Downloader as app  # noqa: E402
+
+HANDLE = "BenchFx1"
+FILE_NAME = "bench_fixture.mp4"
+
+
+def b64encode(data):
+    """MEGA-style unpadded URL-safe base64."""
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def build_fixture(size):
+    """Encrypt random data the way MEGA stores it.
+
+    Returns (plaintext, ciphertext, link key string, encrypted attributes).
+    """
+    plaintext = os.urandom(size)
+    aes_key = os.urandom(16)
+    nonce = os.urandom(8)
+    ciphertext = AES.new(aes_key, AES.MODE_CTR, nonce=nonce, initial_value=0).encrypt(
+        plaintext
+    )
+
+    chunk_macs = [
+        app.mega_chunk_mac(aes_key, nonce, plaintext[offset : offset + length])
+        for offset, length in app.get_mega_chunks(size)
+    ]
+    meta_mac = app.mega_meta_mac(aes_key, chunk_macs)
+
+    # Link key: (aes_key XOR second half) + nonce + meta MAC
+    second_half = nonce + meta_mac
+    first_half = bytes(a ^ b for a, b in zip(aes_key, second_half))
+    key_string = b64encode(first_half + second_half)
+
+    attributes = b"MEGA" + json.dumps({"n": FILE_NAME}).encode()
+    attributes += b"\0" * (-len(attributes) % 16)
+    encrypted_attributes = b64encode(
+        AES.new(aes_key, AES.MODE_CBC, iv=bytes(16)).encrypt(attributes)
+    )
+    return plaintext, ciphertext, key_string, encrypted_attributes
+
+
+class MegaStandIn(BaseHTTPRequestHandler):
+    """Answers the MEGA API "g" command and serves the encrypted file."""
+
+    protocol_version = "HTTP/1.1"
+    # Set by start_server()
+    ciphertext = b""
+    encrypted_attributes = ""
+    per_connection_bytes_per_second = 0
+    corrupt_offset = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        host, port = self.server.server_address
+        body = json.dumps(
+            [
+                {
+                    "s": len(self.ciphertext),
+                    "at": self.encrypted_attributes,
+                    "g": f"http://{host}:{port}/dl/{HANDLE}",
+                }
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        size = len(self.ciphertext)
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        start, end = (int(match.group(1)), int(match.group(2)) + 1) if match else (0, size)
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.end_headers()
+
+        block = 256 * 1024
+        for offset in range(start, end, block):
+            data = self.ciphertext[offset : min(offset + block, end)]
+            if self.corrupt_offset is not None and offset <= self.corrupt_offset < offset + len(data):
+                index = self.corrupt_offset - offset
+                data = data[:index] + bytes([data[index] ^ 0xFF]) + data[index + 1 :]
+            self.wfile.write(data)
+            if self.per_connection_bytes_per_second:
+                time.sleep(len(data) / self.per_connection_bytes_per_second)
+
+
+def start_server(ciphertext, encrypted_attributes, per_connection_mbps):
+    """Start the stand-in on a free local port; returns the server."""
+    MegaStandIn.ciphertext = ciphertext
+    MegaStandIn.encrypted_attributes = encrypted_attributes
+    MegaStandIn.per_connection_bytes_per_second = per_connection_mbps * 1024 * 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MegaStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app.MEGA_API_URL = f"http://127.0.0.1:{server.server_address[1]}/cs"
+    return server
+
+
+def download_once(link, connections):
+    """Download the fixture into a new folder; returns (path, seconds, folder)."""
+    app.MEGA_DOWNLOAD_CONNECTIONS = connections
+    folder = tempfile.mkdtemp(prefix="bench_mega_native_")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = app.download_mega_native(link, folder)
+    return path, time.perf_counter() - started, folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--connections", default="1,2,4,8")
+    parser.add_argument(
+        "--per-connection-mbps",
+        type=float,
+        default=0,
+        help="throttle each connection (MB/s, 0 = unlimited)",
+    )
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    print(f"Building {args.size_mb} MB encrypted fixture...")
+    plaintext, ciphertext, key_string, encrypted_attributes = build_fixture(size)
+    expected_digest = hashlib.sha256(plaintext).hexdigest()
+    del plaintext
+    server = start_server(ciphertext, encrypted_attributes, args.per_connection_mbps)
+    link = f"https://mega.nz/file/{HANDLE}#{key_string}"
+
+    print(f"{'connections':>11} {'MB/s':>8}  result")
+    for connections in [int(n) for n in args.connections.split(",")]:
+        path, elapsed, folder = download_once(link, connections)
+        with open(path, "rb") as f:
+            ok = hashlib.sha256(f.read()).hexdigest() == expected_digest
+        print(f"{connections:>11} {args.size_mb / elapsed:>8.1f}  {'OK' if ok else 'CONTENT MISMATCH'}")
+        os.remove(path)
+        os.rmdir(folder)
+        if not ok:
+            sys.exit(1)
+
+    # A flipped byte must fail the MAC check and leave no file behind
+    MegaStandIn.corrupt_offset = size // 2
+    app.MEGA_SEGMENT_RETRIES = 1
+    try:
+        path, _, folder = download_once(link, 4)
+    except app.MegaError as e:
+        print(f"Corrupted download rejected: {e}")
+    else:
+        print("FAIL: corrupted download was accepted")
+        sys.exit(1)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+End-to-End Pipeline Benchmark
+=============================
+Runs download_videos_and_audio() fully offline: a local HTTP server serves
+FFmpeg-generated testsrc fixtures (MP4 with H.264/AAC, WebM with VP9/Opus and
+audio-only M4A) under a unique name per link, and the real pipeline fetches
+them through yt-dlp's generic extractor, converts them and extracts audio.
+Each run happens in its own interpreter and reports links/min, MB/s, CPU
+seconds per item (including FFmpeg) and the interpreter's peak memory. FFmpeg's
+own peak memory is not reported: on Linux a child's ru_maxrss includes the
+memory of the interpreter it was forked from.
+
+The post-processing functions are also timed on their own: reencode_to_mp4()
+(VP9 re-encode, H.264 remux) and extract_audio_to_mp3() on testsrc inputs.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--links N] [--duration SECONDS]
+                                        [--types mp4,webm,audio] [--runs N]
+                                        [--skip-pipeline] [--skip-postprocessing]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows: CPU time and peak memory are not reported
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Fixture type -> (file name, FFmpeg output arguments)
+FIXTURES = {
+    "mp4": (
+        "fixture.mp4",
+        ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-c:a", "aac"],
+    ),
+    "webm": (
+        "fixture.webm",
+        ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-c:a", "libopus"],
+    ),
+    "audio": ("fixture.m4a", ["-vn", "-c:a", "aac"]),
+}
+# Extra inputs for the post-processing benchmark
+POSTPROCESSING_FIXTURES = {
+    "h264.mkv": ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-c:a", "aac"],
+}
+
+
+def make_fixture(ffmpeg_path, path, output_args, duration):
+    """Synthesize a testsrc video with a sine tone."""
+    subprocess.run(
+        [
+            ffmpeg_path,
+            "-v", "error",
+            "-y",
+            "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=30:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+            *output_args,
+            path,
+        ],
+        check=True,
+    )
+
+
+class MediaStandIn(SimpleHTTPRequestHandler):
+    """Serves /media/<name>.<ext> from the fixture with that extension.
+
+    Every link gets its own name, so the pipeline sees distinct videos
+    (titles, archive entries) while only one file per type exists.
+    """
+
+    fixture_folder = ""
+    bytes_sent = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def translate_path(self, path):
+        extension = os.path.splitext(path.split("?")[0])[1]
+        for file_name, _ in FIXTURES.values():
+            if file_name.endswith(extension):
+                return os.path.join(self.fixture_folder, file_name)
+        return os.path.join(self.fixture_folder, "missing")
+
+    def copyfile(self, source, outputfile):
+        sent = 0
+        while True:
+            data = source.read(256 * 1024)
+            if not data:
+                break
+            outputfile.write(data)
+            sent += len(data)
+        with self._lock:
+            MediaStandIn.bytes_sent += sent
+
+
+def start_server(fixture_folder):
+    """Start the stand-in on a free local port; returns (server, base URL)."""
+    MediaStandIn.fixture_folder = fixture_folder
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def usage():
+    """(CPU seconds of this process, CPU seconds of its children, peak RSS MB)."""
+    if resource is None:
+        return None, None, None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return (
+        own.ru_utime + own.ru_stime,
+        children.ru_utime + children.ru_stime,
+        own.ru_maxrss / scale,
+    )
+
+
+def isolate_state(app, work_dir):
+    """Keep the app's state files, caches, logs and metrics out of the repository."""
+    app.STRATEGY_STATS = app.StrategyStats(os.path.join(work_dir, "strategy_stats.json"))
+    app.LIBRARY_INDEX = app.LibraryIndex(os.path.join(work_dir, "library_index.json"))
+    app.FFMPEG_CAPABILITIES_FILE = os.path.join(work_dir, "ffmpeg_capabilities.json")
+    app.TECHNICAL_LOGS.close()
+    app.TECHNICAL_LOGS = app.TechnicalLog(os.path.join(work_dir, "technical.log"))
+    app.METRICS_ENABLED = False
+
+
+def run_pipeline_child(links_file, work_dir):
+    """Run download_videos_and_audio() once in this process; returns the measurements."""
+    import LRGEX_Video_Downloader as app
+
+    isolate_state(app, work_dir)
+    app.get_ffmpeg_path()
+    video_folder = os.path.join(work_dir, "Videos")
+    audio_folder = os.path.join(work_dir, "Audio")
+    before = usage()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.download_videos_and_audio(
+            links_file,
+            video_folder=video_folder,
+            audio_folder=audio_folder,
+            log_file=os.path.join(work_dir, "error_log.txt"),
+            archive_file=os.path.join(work_dir, "download_archive.db"),
+        )
+    elapsed = time.perf_counter() - started
+    after = usage()
+    result = {
+        "elapsed": elapsed,
+        "videos": len(os.listdir(video_folder)),
+        "audio": len(os.listdir(audio_folder)),
+    }
+    if after[0] is not None:
+        result["cpu"] = (after[0] - before[0]) + (after[1] - before[1])
+        result["peak_rss_mb"] = after[2]
+    return result
+
+
+def measure_pipeline(fixture_type, links, base_url, runs):
+    """Run the pipeline on links of one fixture type in fresh interpreters."""
+    extension = os.path.splitext(FIXTURES[fixture_type][0])[1]
+    results = []
+    for run in range(runs):
+        with tempfile.TemporaryDirectory(prefix="bench_pipeline_run_") as work_dir:
+            links_file = os.path.join(work_dir, "links.txt")
+            with open(links_file, "w", encoding="utf-8") as f:
+                for n in range(links):
+                    f.write(f"{base_url}/media/{fixture_type}-{run}-{n:04d}{extension}\n")
+            MediaStandIn.bytes_sent = 0
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", links_file, work_dir],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            result["bytes"] = MediaStandIn.bytes_sent
+            results.append(result)
+    return results
+
+
+def time_postprocessing(function, *args):
+    """Wall and CPU seconds (FFmpeg included) of one post-processing call."""
+    before = usage()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(*args)
+    elapsed = time.perf_counter() - started
+    after = usage()
+    cpu = None if after[0] is None else (after[0] - before[0]) + (after[1] - before[1])
+    return elapsed, cpu
+
+
+def bench_postprocessing(fixture_folder, runs):
+    """Time reencode_to_mp4() and extract_audio_to_mp3() on the testsrc fixtures."""
+    import LRGEX_Video_Downloader as app
+
+    ffmpeg_path = app.get_ffmpeg_path()
+    cases = [
+        ("reencode_to_mp4 (VP9/Opus WebM)", "fixture.webm", "reencode"),
+        ("reencode_to_mp4 (H.264/AAC MKV)", "h264.mkv", "reencode"),
+        ("extract_audio_to_mp3 (MP4)", "fixture.mp4", "audio"),
+        ("extract_audio_to_mp3 (WebM)", "fixture.webm", "audio"),
+    ]
+    print(f"\n{'post-processing':<34} {'wall s':>8} {'CPU s':>8}")
+    for name, file_name, kind in cases:
+        source = os.path.join(fixture_folder, file_name)
+        timings = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory(prefix="bench_postprocessing_") as out_dir:
+                # Work on a copy: the functions may remove or rename their input
+                input_file = os.path.join(out_dir, file_name)
+                shutil.copy2(source, input_file)
+                if kind == "reencode":
+                    output_file = os.path.join(out_dir, "output.mp4")
+                    timings.append(
+                        time_postprocessing(
+                            app.reencode_to_mp4, input_file, output_file, ffmpeg_path
+                        )
+                    )
+                else:
+                    audio_folder = os.path.join(out_dir, "Audio")
+                    os.makedirs(audio_folder)
+                    timings.append(
+                        time_postprocessing(
+                            app.extract_audio_to_mp3, input_file, audio_folder, ffmpeg_path
+                        )
+                    )
+        wall = statistics.median(t[0] for t in timings)
+        cpu = "n/a" if timings[0][1] is None else f"{statistics.median(t[1] for t in timings):.2f}"
+        print(f"{name:<34} {wall:>8.2f} {cpu:>8}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        links_file, work_dir = sys.argv[2:4]
+        print(json.dumps(run_pipeline_child(links_file, work_dir)))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--links", type=int, default=12)
+    parser.add_argument("--duration", type=int, default=10, help="fixture length in seconds")
+    parser.add_argument("--types", default="mp4,webm,audio")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--skip-postprocessing", action="store_true")
+    args = parser.parse_args()
+
+    import LRGEX_Video_Downloader as app
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as fixture_folder:
+        # Before get_ffmpeg_path(), which probes (and caches) FFmpeg's capabilities
+        isolate_state(app, fixture_folder)
+        with contextlib.redirect_stdout(io.StringIO()):
+            ffmpeg_path = app.get_ffmpeg_path()
+
+        print(f"Generating {args.duration}s testsrc fixtures...")
+        for file_name, output_args in list(FIXTURES.values()) + list(
+            POSTPROCESSING_FIXTURES.items()
+        ):
+            make_fixture(
+                ffmpeg_path, os.path.join(fixture_folder, file_name), output_args, args.duration
+            )
+
+        if not args.skip_pipeline:
+            server, base_url = start_server(fixture_folder)
+            print(
+                f"\n{'pipeline':<8} {'links':>5} {'links/min':>10} {'MB/s':>8}"
+                f" {'CPU s/item':>11} {'peak RSS':>10}  output"
+            )
+            try:
+                for fixture_type in args.types.split(","):
+                    results = measure_pipeline(fixture_type, args.links, base_url, args.runs)
+                    elapsed = statistics.median(r["elapsed"] for r in results)
+                    megabytes = statistics.median(r["bytes"] for r in results) / (1024 * 1024)
+                    if "cpu" in results[0]:
+                        cpu = f"{statistics.median(r['cpu'] for r in results) / args.links:.2f}"
+                        rss = f"{max(r['peak_rss_mb'] for r in results):.0f} MB"
+                    else:
+                        cpu = rss = "n/a"
+                    output = f"{results[0]['videos']} videos, {results[0]['audio']} audio"
+                    print(
+                        f"{fixture_type:<8} {args.links:>5} {args.links * 60 / elapsed:>10.1f}"
+                        f" {megabytes / elapsed:>8.2f} {cpu:>11} {rss:>10}  {output}"
+                    )
+            finally:
+                server.shutdown()
+
+        if not args.skip_postprocessing:
+            bench_postprocessing(fixture_folder, args.runs)
+
+
+if __name__ == "__main__":
+    main()
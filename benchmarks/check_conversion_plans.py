@@ -0,0 +1,77 @@
+"""
+MP4 Conversion Plan Check
+=========================
+Runs plan_mp4_conversion() on probe results (audio-only, stream copy, audio
+re-encode) and fails when the FFmpeg arguments or the printed description
+differ from what is expected. Needs no FFmpeg: none of the cases re-encodes
+video, so no encoder is detected.
+
+Usage:
+    python benchmarks/check_conversion_plans.py
+"""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import LRGEX_Video_Downloader as app  # noqa: E402
+
+
+def streams(*codecs):
+    """Probe result with one stream per (codec_type, codec_name)."""
+    return [
+        {"index": index, "codec_type": codec_type, "codec_name": codec_name}
+        for index, (codec_type, codec_name) in enumerate(codecs)
+    ]
+
+
+# (name, probe result, expected output args, expected description)
+CASES = [
+    (
+        "audio-only AAC",
+        streams(("audio", "aac")),
+        ["-map", "0:v:0?", "-map", "0:a:0?", "-c:a", "copy"],
+        "copying audio (no video stream)",
+    ),
+    (
+        "audio-only Opus",
+        streams(("audio", "opus")),
+        ["-map", "0:v:0?", "-map", "0:a:0?", "-c:a", "aac", "-b:a", "128k"],
+        "re-encoding opus audio to AAC (no video stream)",
+    ),
+    (
+        "H.264 + AAC",
+        streams(("video", "h264"), ("audio", "aac")),
+        ["-map", "0:v:0?", "-map", "0:a:0?", "-c:v", "copy", "-c:a", "copy"],
+        "remuxing (stream copy)",
+    ),
+    (
+        "H.264 + Opus",
+        streams(("video", "h264"), ("audio", "opus")),
+        ["-map", "0:v:0?", "-map", "0:a:0?", "-c:v", "copy", "-c:a", "aac", "-b:a", "128k"],
+        "copying video, re-encoding opus audio to AAC",
+    ),
+]
+
+
+def main():
+    problems = []
+    for name, probe, expected_args, expected_description in CASES:
+        input_args, output_args, description = app.plan_mp4_conversion(probe, None)
+        if input_args or output_args != expected_args:
+            problems.append(f"{name}: arguments {input_args} {output_args}")
+        if description != expected_description:
+            problems.append(f"{name}: description {description!r}")
+        print(f"{name:<16} {description}")
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Startup Time Budget Check
+=========================
+Imports LRGEX_Video_Downloader in fresh interpreters and fails when the import
+is slower than the budget, or when it does work that must stay lazy
+(browser cookie detection, importing gallery-dl).
+
+Usage:
+    python benchmarks/check_startup_time.py [--budget SECONDS] [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default import budget in seconds (yt-dlp and requests dominate the import)
+DEFAULT_BUDGET = 1.5
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {repo_dir!r})
+started = time.perf_counter()
+import LRGEX_Video_Downloader as app
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "elapsed": elapsed,
+    "gallery_dl_imported": "gallery_dl" in sys.modules,
+    "browser_detected": app._available_browser is not app._NOT_DETECTED,
+}}))
+"""
+
+
+def run_probe():
+    """Import the app once in a new interpreter and return the probe result."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(repo_dir=REPO_DIR)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit=5):
+    """Return the modules with the largest cumulative import time (microseconds)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import LRGEX_Video_Downloader"],
+        capture_output=True,
+        text=True,
+        cwd=REPO_DIR,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_probe() for _ in range(args.runs)]
+    median = statistics.median(r["elapsed"] for r in results)
+    print(f"Import time (median of {args.runs}): {median:.3f}s, budget {args.budget:.3f}s")
+
+    problems = []
+    if median > args.budget:
+        problems.append("import is over budget")
+    if any(r["gallery_dl_imported"] for r in results):
+        problems.append("gallery_dl is imported at startup")
+    if any(r["browser_detected"] for r in results):
+        problems.append("browser cookie detection runs at startup")
+
+    if problems:
+        print("Slowest imports:")
+        for cumulative_us, module in slowest_imports():
+            print(f"  {cumulative_us / 1e6:.3f}s  {module}")
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()